@@ -0,0 +1,136 @@
+# api/Classifier/chunking.py
+
+import re
+
+# אירועים במסמך TEI לפי הסדר: תחילת משטח (surface/lg/div), הערה שמתארת אותו, ושורת כתובת
+_XML_EVENT_PATTERN = re.compile(
+    r"<(?P<surface>surface|lg|div)\b(?P<surface_attrs>[^>]*)>"
+    r"|<note>(?P<note>[^<]*)</note>"
+    r"|<l\b(?P<attrs>[^>]*)>(?P<line>.*?)</l>",
+    re.DOTALL
+)
+_LINE_NUMBER_PATTERN = re.compile(r'\bn="([^"]*)"')
+# שם המשטח: subtype (EpiDoc textpart) ואחריו n ו-type
+_SURFACE_LABEL_PATTERNS = [re.compile(rf'\b{name}="([^"]*)"') for name in ("subtype", "n", "type")]
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+class Section:
+    """
+    משטח אחד של הכתובת (צד קדמי, צד אחורי, שפה...) והשורות שלו
+    """
+
+    __slots__ = ("label", "lines")
+
+    def __init__(self, label):
+        self.label = label
+        self.lines = []
+
+    def size(self):
+        return sum(len(line) + 1 for line in self.lines)
+
+
+def split_sections(text):
+    """
+    פירוק הקלט לשורות כתובת לפי משטחים
+
+    ב-XML כל תג <l> הופך לשורה אחת עם מספר השורה והמילים שלה, בלי הסימון.
+    בטקסט רגיל (ATF) כל שורה נשמרת כמו שהיא, ושורות שמתחילות ב-@ פותחות משטח חדש.
+
+    Returns:
+        list: רשימת Section לפי הסדר, בלי משטחים ריקים
+    """
+    sections = [Section(None)]
+    if "<l" in text:
+        for match in _XML_EVENT_PATTERN.finditer(text):
+            if match.group("surface"):
+                label = _surface_label(match.group("surface_attrs"))
+                # משטח פנימי בלי שם (lg בתוך div) שייך למשטח שעדיין אין בו שורות
+                if label is None and not sections[-1].lines:
+                    label = sections[-1].label
+                sections.append(Section(label))
+            elif match.group("note") is not None:
+                note = match.group("note").strip()
+                # הערות שמתחילות ב-$ מתארות מצב פיזי ולא את שם המשטח
+                if note and not note.startswith("$") and sections[-1].label is None:
+                    sections[-1].label = note
+            else:
+                number = _LINE_NUMBER_PATTERN.search(match.group("attrs"))
+                body = match.group("line")
+                # הסימון מוסר אבל צורת המילים נשמרת, כולל [...] ו-x שמסמנים שברים בלוח
+                words = _TAG_PATTERN.sub(" ", body).split()
+                prefix = f"{number.group(1)}: " if number else ""
+                sections[-1].lines.append(prefix + " ".join(words))
+    if not any(section.lines for section in sections):
+        sections = [Section(None)]
+        for line in text.splitlines():
+            if line.startswith("@"):
+                sections.append(Section(line[1:].strip()))
+            elif line.strip():
+                sections[-1].lines.append(line.rstrip())
+    return [section for section in sections if section.lines]
+
+
+def _surface_label(attrs):
+    for pattern in _SURFACE_LABEL_PATTERNS:
+        match = pattern.search(attrs)
+        if match:
+            return match.group(1)
+    return None
+
+
+def chunk_text(text, max_chars):
+    """
+    חלוקת קלט גדול לקטעים של עד max_chars תווים, בגבולות של משטחים ושורות
+
+    משטח שלם נשאר בקטע אחד כשאפשר; משטח גדול מדי מתחלק בין שורות, ושורה בודדת
+    שגדולה מהמגבלה מתחלקת בין מילים. שום תוכן לא נחתך או מושמט.
+
+    Returns:
+        list: הקטעים לפי הסדר - כל קטע הוא טקסט שבו כל משטח מתחיל בכותרת [שם המשטח]
+    """
+    chunks = []
+    current = []
+    current_size = 0
+
+    def flush():
+        nonlocal current, current_size
+        if current:
+            chunks.append("\n".join(current))
+        current, current_size = [], 0
+
+    for section in split_sections(text):
+        header = f"[{section.label}]" if section.label else None
+        section_size = section.size() + (len(header) + 1 if header else 0)
+        # משטח שנכנס שלם בקטע חדש לא מפוצל בין שני קטעים
+        if current and current_size + section_size > max_chars and section_size <= max_chars:
+            flush()
+        if header:
+            current.append(header)
+            current_size += len(header) + 1
+        for line in section.lines:
+            for piece in _split_long_line(line, max_chars):
+                if current and current[-1] != header and current_size + len(piece) + 1 > max_chars:
+                    flush()
+                    if header:
+                        current.append(header)
+                        current_size += len(header) + 1
+                current.append(piece)
+                current_size += len(piece) + 1
+    flush()
+    return chunks
+
+
+def _split_long_line(line, max_chars):
+    if len(line) <= max_chars:
+        return [line]
+    pieces, piece = [], ""
+    for word in line.split(" "):
+        if piece and len(piece) + 1 + len(word) > max_chars:
+            pieces.append(piece)
+            piece = word
+        else:
+            piece = f"{piece} {word}" if piece else word
+    if piece:
+        pieces.append(piece)
+    return pieces
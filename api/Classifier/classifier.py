@@ -1,68 +1,90 @@
 import os
-from transformers import BertForSequenceClassification, BertTokenizer
+import threading
+from .indicators import GENRE_RULES, GENRE_DEFAULT, PERIOD_RULES, PERIOD_DEFAULT, canonical_rules, match_rules
+from .normalization import normalize
+
+_GENRE_RULES = canonical_rules(GENRE_RULES)
+_PERIOD_RULES = canonical_rules(PERIOD_RULES)
+
+_CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+GENRE_MODEL_PATH = os.path.join(_CURRENT_DIR, "genre_model")
+PERIOD_MODEL_PATH = os.path.join(_CURRENT_DIR, "period_model")
+
+# מודלים שנטענו בתהליך - כל מודל נטען פעם אחת ומשותף לכל המופעים.
+# כשהשרת רץ בכמה תהליכים, הטעינה נעשית בתהליך האב לפני הפיצול (preload_models)
+# וכל העובדים קוראים את אותם דפי זיכרון של המשקולות.
+_loaded_models = {}
+_models_lock = threading.Lock()
+
+
+def load_model(model_path):
+    """
+    טעינת מודל BERT וה-tokenizer שלו, פעם אחת לכל תהליך
+
+    Returns:
+        tuple: (tokenizer, model), או None אם אין מודל בנתיב
+    """
+    with _models_lock:
+        if model_path not in _loaded_models:
+            if os.path.isdir(model_path):
+                # רק מודלי BERT צריכים את transformers - הסיווג לפי כללים עובד בלעדיה
+                from transformers import BertForSequenceClassification, BertTokenizer
+                tokenizer = BertTokenizer.from_pretrained(model_path)
+                model = BertForSequenceClassification.from_pretrained(model_path)
+                # המשקולות רק נקראות - כך הדפים שלהן לא מועתקים אחרי fork
+                model.eval()
+                model.requires_grad_(False)
+                _loaded_models[model_path] = (tokenizer, model)
+            else:
+                _loaded_models[model_path] = None
+        return _loaded_models[model_path]
+
+
+def preload_models():
+    """
+    טעינת כל המודלים מראש (בתהליך האב, לפני יצירת העובדים)
+
+    Returns:
+        list: הנתיבים של המודלים שנטענו
+    """
+    return [path for path in (GENRE_MODEL_PATH, PERIOD_MODEL_PATH) if load_model(path) is not None]
+
+
+def model_weight_bytes():
+    """
+    גודל המשקולות של כל המודלים שנטענו בתהליך, בבתים
+    """
+    with _models_lock:
+        loaded = [entry for entry in _loaded_models.values() if entry is not None]
+    return sum(
+        parameter.numel() * parameter.element_size()
+        for _, model in loaded
+        for parameter in model.parameters()
+    )
+
 
 class BaseClassifier:
     def __init__(self, model_path):
         if model_path.startswith('./'):
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            model_path = os.path.join(current_dir, model_path[2:])
+            model_path = os.path.join(_CURRENT_DIR, model_path[2:])
+        self.model_path = model_path
+
+    @property
+    def model(self):
+        """(tokenizer, model) מהמטמון של התהליך, או None אם המודל לא קיים"""
+        return load_model(self.model_path)
 
 
 class GenreClassifier(BaseClassifier):
     def __init__(self):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, "genre_model")
-        super().__init__(model_path)
-    
+        super().__init__(GENRE_MODEL_PATH)
+
     def classify(self, text):
-        text_lower = text.lower()
-        economic_indicators = ["gur", "barley", "še", "silver", "maš", "ĝa₂-ĝa₂", "interest"]
-        if any(indicator in text_lower for indicator in economic_indicators):
-            return "מסמך כלכלי - עסקת שעורים"
-            
-        legal_indicators = ["ba-ti", "šu", "ib₂-ge-ne₂", "confirm"]
-        if any(indicator in text_lower for indicator in legal_indicators):
-            return "מסמך משפטי - אישור עסקה"
-            
-        if "mu" in text_lower and ("us₂-sa" in text_lower or "year" in text_lower):
-            return "נוסחת תיארוך מלכותית"
-            
-        religious_indicators = ["dingir", "god", "temple", "e₂"]
-        if any(indicator in text_lower for indicator in religious_indicators):
-            return "טקסט דתי או פולחני"
-            
-        return "כתובת אדמיניסטרטיבית כללית"
+        return match_rules(normalize(text).text, _GENRE_RULES, GENRE_DEFAULT)
 
 class PeriodClassifier(BaseClassifier):
     def __init__(self):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, "period_model")
-        super().__init__(model_path)
-    
+        super().__init__(PERIOD_MODEL_PATH)
+
     def classify(self, text):
-        text_lower = text.lower()
-        
-        # תקופת אור השלישית
-        if "š 35" in text_lower or "anshan" in text_lower:
-            return "תקופת אור השלישית - שנת 35 לשולגי (כ-2059 לפנה״ס)"
-            
-        # אינדיקטורים לתקופות שונות
-        if "gur" in text_lower and "še" in text_lower:
-            # מערכת מידות של תקופת אור השלישית
-            return "תקופת אור השלישית (2112-2004 לפנה״ס)"
-            
-        # תקופה בבלית עתיקה
-        old_babylonian_indicators = ["sin-muballit", "hammurabi", "rim-sin"]
-        if any(indicator in text_lower for indicator in old_babylonian_indicators):
-            return "התקופה הבבלית העתיקה (1894-1594 לפנה״ס)"
-            
-        # תקופה אשורית
-        assyrian_indicators = ["aššur", "ninua", "kalhu"]
-        if any(indicator in text_lower for indicator in assyrian_indicators):
-            return "התקופה האשורית החדשה (912-609 לפנה״ס)"
-            
-        # מדד כללי לפי תוכן
-        if "%sux" in text_lower:
-            return "תקופת אור השלישית או תקופה פליאו-בבלית (2100-1600 לפנה״ס)"
-            
-        return "תקופה לא מזוהה - דרושה בדיקה נוספת"
\ No newline at end of file
+        return match_rules(normalize(text).text, _PERIOD_RULES, PERIOD_DEFAULT)
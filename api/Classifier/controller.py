@@ -1,6 +1,7 @@
 # api/Classifier/controller.py
 
 from .classifier import GenreClassifier, PeriodClassifier
+from .normalization import canonical, normalize, xml_tokens
 import re
 import xml.etree.ElementTree as ET
 
@@ -15,10 +16,30 @@ class TransliterationResult:
     def __str__(self):
         return f"Genre: {self.Genre}, Period: {self.Period}, Data: {self.StructuredData}"
 
+# מונחים כלכליים - שם המונח לתצוגה וצורתו הקנונית לחיפוש
+ECONOMIC_TERMS = [(term, canonical(term)) for term in ["gur", "še", "barley", "silver", "gold", "iku", "maš", "HA.LAM"]]
+
+# לוגוגרמות נבדקות עם שמירה על אותיות גדולות
+ASSYRIAN_TERMS = [canonical(term, fold=False) for term in ["šu₂", "TUK", "KUR", "IGI", "DAM", "TUR₃", "UMUŠ"]]
+SUMERIAN_TERMS = [canonical(term, fold=False) for term in ["NIG₂", "HA.LAM", "ME", "TI"]]
+
+LEGAL_CONTENT_TERMS = [canonical(term) for term in ["DAM", "TUK", "NU"]]  # אישה, יש, לא
+RELIGIOUS_CONTENT_TERMS = [canonical(term) for term in ["DINGIR", "AN", "EN"]]
+ECONOMIC_CONTENT_TERMS = [canonical(term) for term in ["HA.LAM", "NIG₂", "GUR"]]
+
+# סמני שפה - הראשון שנמצא קובע
+LANGUAGE_MARKERS = [("%sux", "שומרית"), ("%akk", "אכדית"), ("assyrian", "אשורית"), ("babylonian", "בבלית")]
+
+NUMBER_PATTERN = re.compile(r'\b\d+(?:\.\d+)*\b')
+
 def analyze_cuneiform_text(text):
     """
     ניתוח מעמיק של טקסט כתובת יתדות כולל ניתוח XML
+
+    מקבל str או NormalizedText - הנרמול מתבצע פעם אחת בלבד
     """
+    normalized = normalize(text)
+    text = normalized.original
     analysis = {
         "language": "unknown",
         "script_type": "cuneiform",
@@ -34,37 +55,31 @@ def analyze_cuneiform_text(text):
     }
     
     # בדוק אם זה XML
-    if text.strip().startswith('<?xml') or '<TEI' in text:
+    if normalized.is_xml:
         analysis["xml_content"] = True
-        extracted_words = extract_words_from_xml(text)
-        analysis["cuneiform_words"] = extracted_words
+        analysis["cuneiform_words"] = [token.word for token in normalized.tokens]
         
         # נתח את המילים שחילצנו
-        analysis = analyze_extracted_words(analysis, extracted_words)
+        analysis = analyze_extracted_words(analysis, normalized.tokens)
     
     # זיהוי שפה
-    if "%sux" in text:
-        analysis["language"] = "שומרית"
-    elif "%akk" in text:
-        analysis["language"] = "אכדית"
-    elif any(word in text.lower() for word in ["neo-assyrian", "assyrian"]):
-        analysis["language"] = "אשורית"
-    elif "babylonian" in text.lower():
-        analysis["language"] = "בבלית"
+    for marker, language in LANGUAGE_MARKERS:
+        if marker in normalized.text:
+            analysis["language"] = language
+            break
     
     # חיפוש מונחים כלכליים
-    economic_terms = ["gur", "še", "barley", "silver", "gold", "iku", "maš", "HA.LAM"]
-    for term in economic_terms:
-        if term in text:
+    for term, form in ECONOMIC_TERMS:
+        if form in normalized.text:
             analysis["economic_terms"].append(term)
     
     # חיפוש מספרים
-    numbers = re.findall(r'\b\d+(?:\.\d+)*\b', text)
+    numbers = NUMBER_PATTERN.findall(text)
     analysis["numbers"] = numbers
     
     # זיהוי סוג תוכן מתקדם
     if analysis["cuneiform_words"]:
-        analysis["content_type"] = determine_content_type_from_words(analysis["cuneiform_words"])
+        analysis["content_type"] = determine_content_type_from_words(normalized.tokens)
     elif analysis["economic_terms"]:
         analysis["content_type"] = "כלכלי"
     
@@ -74,53 +89,18 @@ def extract_words_from_xml(xml_text):
     """
     חילוץ מילים מקובץ XML TEI
     """
-    words = []
-    try:
-        # נקה את ה-XML מרווחים מיותרים
-        cleaned_xml = re.sub(r'\s+', ' ', xml_text)
-        
-        # חלץ כל התוכן של תגי <w>
-        word_pattern = r'<w[^>]*>(.*?)</w>'
-        found_words = re.findall(word_pattern, cleaned_xml, re.DOTALL)
-        
-        for word in found_words:
-            # נקה מתגי HTML ותווים מיותרים
-            clean_word = re.sub(r'<[^>]+>', '', word).strip()
-            # הסר סוגריים מרובעים ונקודות
-            clean_word = re.sub(r'[\[\]\.]+', '', clean_word)
-            if clean_word and clean_word not in ['...', 'x', '']:
-                words.append(clean_word)
-        
-        # אם לא מצאנו מילים בתגי <w>, נחפש בתגי <l>
-        if not words:
-            line_pattern = r'<l[^>]*>(.*?)</l>'
-            found_lines = re.findall(line_pattern, cleaned_xml, re.DOTALL)
-            for line in found_lines:
-                # חלץ טקסט מבין התגים
-                text_only = re.sub(r'<[^>]+>', ' ', line)
-                line_words = text_only.split()
-                for word in line_words:
-                    clean_word = re.sub(r'[\[\]\.]+', '', word).strip()
-                    if clean_word and len(clean_word) > 1:
-                        words.append(clean_word)
-        
-    except Exception as e:
-        print(f"Error parsing XML: {e}")
-    
-    return words
+    return [token.word for token in xml_tokens(xml_text)]
 
-def analyze_extracted_words(analysis, words):
+def analyze_extracted_words(analysis, tokens):
     """
-    ניתוח המילים שחולצו מה-XML
+    ניתוח המילים שחולצו מה-XML (רשימת Token)
     """
     # בדוק מונחים אשוריים/אכדיים
-    assyrian_terms = ["šu₂", "TUK", "KUR", "IGI", "DAM", "TUR₃", "UMUŠ"]
-    sumerian_terms = ["NIG₂", "HA.LAM", "ME", "TI"]
-    
-    for word in words:
-        if any(term in word for term in assyrian_terms):
+    for token in tokens:
+        word = token.cased
+        if any(term in word for term in ASSYRIAN_TERMS):
             analysis["language"] = "אשורית/אכדית"
-        if any(term in word for term in sumerian_terms):
+        if any(term in word for term in SUMERIAN_TERMS):
             if analysis["language"] == "unknown":
                 analysis["language"] = "שומרית"
             else:
@@ -128,51 +108,46 @@ def analyze_extracted_words(analysis, words):
     
     return analysis
 
-def determine_content_type_from_words(words):
+def determine_content_type_from_words(tokens):
     """
-    קביעת סוג התוכן על בסיס המילים
+    קביעת סוג התוכן על בסיס המילים (רשימת Token)
     """
-    # מונחים משפטיים
-    legal_terms = ["DAM", "TUK", "NU"]  # אישה, יש, לא
-    
-    # מונחים דתיים
-    religious_terms = ["DINGIR", "AN", "EN"]
+    word_text = " ".join(token.form for token in tokens)
     
-    # מונחים כלכליים
-    economic_terms = ["HA.LAM", "NIG₂", "GUR"]
-    
-    word_text = " ".join(words).upper()
-    
-    if any(term in word_text for term in legal_terms):
+    if any(term in word_text for term in LEGAL_CONTENT_TERMS):
         return "משפטי/משפחתי"
-    elif any(term in word_text for term in economic_terms):
+    elif any(term in word_text for term in ECONOMIC_CONTENT_TERMS):
         return "כלכלי"
-    elif any(term in word_text for term in religious_terms):
+    elif any(term in word_text for term in RELIGIOUS_CONTENT_TERMS):
         return "דתי"
     else:
         return "אדמיניסטרטיבי"
 
-def extract_transliteration(input_text, input_type):
+def extract_transliteration(input_text, input_type, analysis=None):
     """
     חילוץ מידע מכתובת יתדות עם ניתוח מעמיק
+
+    analysis - תוצאת analyze_cuneiform_text אם כבר חושבה, כדי לא לנתח שוב
     """
+    normalized = normalize(input_text)
     print(f"מעבד סוג קלט: {input_type}")
-    print(f"אורך טקסט: {len(input_text)}")
+    print(f"אורך טקסט: {len(normalized)}")
     
     try:
         # ניתוח מעמיק של הטקסט
-        analysis = analyze_cuneiform_text(input_text)
+        if analysis is None:
+            analysis = analyze_cuneiform_text(normalized)
         
         # יצירת מודלים (mock לעת עתה)
         genre_classifier = GenreClassifier()
         period_classifier = PeriodClassifier()
         
         # סיווג
-        genre = genre_classifier.classify(input_text)
-        period = period_classifier.classify(input_text)
+        genre = genre_classifier.classify(normalized)
+        period = period_classifier.classify(normalized)
         
         # יצירת טקסט מובנה לGemini
-        structured_summary = create_structured_summary(analysis, input_text)
+        structured_summary = create_structured_summary(analysis, normalized.original)
         
         result = TransliterationResult(
             text=structured_summary,  # כאן אנו שולחים את הסיכום המובנה
@@ -239,14 +214,5 @@ def create_structured_summary(analysis, original_text):
 מידע מובנה:
 """ + "\n".join([f"• {part}" for part in summary_parts])
     
-    structured_text += f"""
-
-בקשה: אנא ספק ניתוח מקצועי ומפורט של כתובת יתדות זו בעברית, כולל:
-1. הקשר היסטורי ותרבותי
-2. ניתוח לשוני של המילים האכדיות/שומריות
-3. משמעות התוכן והחשיבות הארכיאולוגית
-4. פרטים על התקופה והמקום
-5. השוואה לכתובות דומות
-"""
-    
+    # הבקשה עצמה אינה חלק מהסיכום - היא נשלחת פעם אחת כהוראת מערכת של המודל
     return structured_text
\ No newline at end of file
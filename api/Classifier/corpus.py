@@ -0,0 +1,166 @@
+# api/Classifier/corpus.py
+
+import codecs
+import multiprocessing
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .classifier import GenreClassifier, PeriodClassifier
+from .controller import analyze_cuneiform_text
+from .normalization import normalize
+
+# מסמך בקורפוס הוא אלמנט <TEI> שלם, או <text> שאינו בתוך <TEI>
+_DOCUMENT_START = re.compile(r"<(TEI|text)(?=[\s>/])")
+_TITLE_PATTERN = re.compile(r"<title(?:\s[^>]*)?>(.*?)</title>", re.DOTALL)
+_ID_PATTERN = re.compile(r'xml:id="([^"]+)"')
+
+_pool = None
+
+
+def iter_corpus_documents(chunks):
+    """
+    פיצול קובץ קורפוס למסמכים בזמן הקריאה - מסמך מוחזר ברגע שתג הסגירה שלו הגיע
+
+    Args:
+        chunks (iterable): חלקי הקלט לפי הסדר (str או bytes ב-UTF-8)
+
+    Yields:
+        str: ה-XML של מסמך אחד
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    for chunk in chunks:
+        buffer += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        # מתקדמים במצביע ולא בחיתוך, כדי לא להעתיק את המאגר אחרי כל מסמך
+        position = 0
+        while True:
+            document, next_position = _next_document(buffer, position)
+            if document is not None:
+                yield document
+                position = next_position
+            elif next_position is not None:
+                # מסמך שעדיין לא נסגר - שומרים רק ממנו והלאה
+                buffer = buffer[next_position:]
+                break
+            else:
+                # אין תחילת מסמך - שומרים רק זנב שעשוי להיות תחילת תג חתוכה
+                buffer = buffer[max(position, len(buffer) - len("<text")):]
+                break
+    buffer += decoder.decode(b"", final=True)
+    document, _ = _next_document(buffer, 0)
+    if document is not None:
+        yield document
+
+
+def _next_document(buffer, position):
+    """
+    Returns:
+        tuple: (document, end) אם נמצא מסמך שלם; (None, start) אם מסמך עדיין לא נסגר;
+               (None, None) אם אין תחילת מסמך
+    """
+    start_match = _DOCUMENT_START.search(buffer, position)
+    if start_match is None:
+        return None, None
+    tag = start_match.group(1)
+    tag_pattern = re.compile(rf"<(/?){tag}(?=[\s>/])")
+    depth = 0
+    for match in tag_pattern.finditer(buffer, start_match.start()):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            end = buffer.find(">", match.end())
+            if end == -1:
+                break
+            return buffer[start_match.start():end + 1], end + 1
+    return None, start_match.start()
+
+
+def analyze_document(document):
+    """
+    ניתוח מסמך בודד - רץ בתהליך עובד, ולכן מחזיר רק נתונים פשוטים
+    """
+    normalized = normalize(document)
+    analysis = analyze_cuneiform_text(normalized)
+    title = _TITLE_PATTERN.search(document)
+    document_id = _ID_PATTERN.search(document)
+    return {
+        "id": document_id.group(1) if document_id else None,
+        "title": title.group(1).strip() if title else None,
+        "genre": GenreClassifier().classify(normalized),
+        "period": PeriodClassifier().classify(normalized),
+        "language": analysis["language"],
+        "content_type": analysis["content_type"],
+        "cuneiform_words": analysis["cuneiform_words"],
+        "economic_terms": analysis["economic_terms"],
+    }
+
+
+def analyze_documents(batch):
+    """
+    ניתוח קבוצת מסמכים בקריאה אחת לתהליך העובד, כדי לחסוך תקורת IPC למסמכים קטנים
+    """
+    results = []
+    for index, document in batch:
+        try:
+            results.append({"index": index, "status": "success", **analyze_document(document)})
+        except Exception as e:
+            results.append({"index": index, "status": "error", "error": str(e)})
+    return results
+
+
+def get_process_pool():
+    """
+    מאגר תהליכים משותף - נוצר בפעם הראשונה שצריך אותו
+
+    התהליכים נוצרים מ-forkserver ולא ב-fork של השרת: השרת כבר מריץ threads (warm-up,
+    מאגרי threads, ערוצי gRPC), ו-fork של תהליך כזה עלול להשאיר בילד נעילה תפוסה לתמיד.
+    ה-forkserver טוען את מודול הקורפוס פעם אחת, וכל תהליך עובד מתפצל ממנו מוכן.
+
+    Returns:
+        tuple: (pool, max_workers)
+    """
+    global _pool
+    if _pool is None:
+        max_workers = int(os.environ.get("CORPUS_WORKERS", os.cpu_count() or 1))
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        _pool = (ProcessPoolExecutor(max_workers=max_workers, mp_context=context), max_workers)
+    return _pool
+
+
+def analyze_corpus(chunks, batch_size=8):
+    """
+    ניתוח מקבילי של כל המסמכים בקורפוס
+
+    המסמכים נשלחים למאגר התהליכים בקבוצות קטנות תוך כדי הפיצול, ומספר הקבוצות
+    שממתינות מוגבל כדי שקובץ גדול לא ייטען כולו לזיכרון.
+
+    Yields:
+        dict: תוצאה לכל מסמך לפי סדר הסיום, עם index לפי הסדר בקובץ
+    """
+    pool, max_workers = get_process_pool()
+    max_in_flight = max_workers * 2
+    pending = set()
+    batch = []
+
+    def drain(block):
+        nonlocal pending
+        if block:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        else:
+            done = {future for future in pending if future.done()}
+            pending -= done
+        for future in done:
+            yield from future.result()
+
+    for index, document in enumerate(iter_corpus_documents(chunks)):
+        batch.append((index, document))
+        if len(batch) >= batch_size:
+            pending.add(pool.submit(analyze_documents, batch))
+            batch = []
+            yield from drain(block=len(pending) >= max_in_flight)
+
+    if batch:
+        pending.add(pool.submit(analyze_documents, batch))
+    while pending:
+        yield from drain(block=True)
@@ -0,0 +1,196 @@
+# api/Classifier/incremental.py
+
+from collections import Counter
+from functools import lru_cache
+
+from .controller import (
+    ECONOMIC_TERMS, LANGUAGE_MARKERS, NUMBER_PATTERN,
+    analyze_extracted_words, create_structured_summary, determine_content_type_from_words,
+)
+from .indicators import GENRE_RULES, GENRE_DEFAULT, PERIOD_RULES, PERIOD_DEFAULT, canonical_rules, match_rule_terms
+from .normalization import canonical, w_tokens, xml_tokens
+
+_GENRE_RULES = canonical_rules(GENRE_RULES)
+_PERIOD_RULES = canonical_rules(PERIOD_RULES)
+
+# כל המונחים שהסיווג תלוי בהם - אף אחד מהם לא מכיל ירידת שורה,
+# ולכן הופעה של מונח בטקסט המלא היא תמיד הופעה בתוך שורה אחת
+_VOCAB = sorted(
+    {term for _, clauses in _GENRE_RULES + _PERIOD_RULES for clause in clauses for term in clause}
+    | {form for _, form in ECONOMIC_TERMS}
+    | {marker for marker, _ in LANGUAGE_MARKERS}
+)
+
+# מפתח פנימי לשורות שמכילות את תג השורש של TEI
+_TEI_MARKER = "<TEI"
+
+
+class LineFeatures:
+    """
+    המאפיינים של שורה אחת - מחושבים פעם אחת לכל תוכן שורה שונה
+    """
+
+    __slots__ = ("terms", "numbers", "tokens", "split_words")
+
+    def __init__(self, terms, numbers, tokens, split_words):
+        self.terms = terms
+        self.numbers = numbers
+        # מילות <w> של השורה - ההיסטים שלהן יחסיים לשורה
+        self.tokens = tokens
+        # תג <w> שנפתח או נסגר בשורה אחרת - המילה שלו לא נמצאת בחילוץ לפי שורה
+        self.split_words = split_words
+
+
+@lru_cache(maxsize=65536)
+def line_features(line):
+    text = canonical(line)
+    terms = frozenset(term for term in _VOCAB if term in text)
+    if _TEI_MARKER in line:
+        terms = terms | {_TEI_MARKER}
+    tokens = tuple(w_tokens(line)) if "<w" in line else ()
+    split_words = line.count("<w") != line.count("</w>")
+    return LineFeatures(terms, tuple(NUMBER_PATTERN.findall(line)), tokens, split_words)
+
+
+class IncrementalAnalysis:
+    """
+    ניתוח שמתעדכן לפי שינויים ברמת השורה
+
+    לכל שורה נשמרים המאפיינים שלה, ולטקסט כולו - מונה של מספר השורות שמכילות כל מונח.
+    עריכה של שורה מחסירה את המאפיינים הישנים ומוסיפה את החדשים, בלי לעבור על שאר הטקסט.
+    """
+
+    def __init__(self, text):
+        self.lines = text.split("\n")
+        self._features = [line_features(line) for line in self.lines]
+        self._term_lines = Counter()
+        for features in self._features:
+            self._term_lines.update(features.terms)
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def apply_edits(self, edits):
+        """
+        החלת רשימת שינויים לפי הסדר
+
+        Args:
+            edits (list): רשומות {'op': 'replace'|'insert'|'delete', 'line': int, 'text': str}
+                          מספרי השורות מתחילים מ-0 ומתייחסים למצב אחרי השינוי הקודם
+
+        Raises:
+            ValueError: אם שינוי לא תקין - במקרה כזה אף שינוי לא מוחל
+        """
+        snapshot = (list(self.lines), list(self._features), Counter(self._term_lines))
+        try:
+            for edit in edits:
+                self._apply_edit(edit)
+        except ValueError:
+            self.lines, self._features, self._term_lines = snapshot
+            raise
+
+    def _apply_edit(self, edit):
+        if not isinstance(edit, dict):
+            raise ValueError(f"Invalid edit: {edit}")
+        op = edit.get("op")
+        index = edit.get("line")
+        text = edit.get("text", "")
+        if not isinstance(text, str) or "\n" in text:
+            raise ValueError("Edit text must be a single line")
+        if not isinstance(index, int):
+            raise ValueError(f"Edit is missing a line number: {edit}")
+        upper = len(self.lines) if op == "insert" else len(self.lines) - 1
+        if not 0 <= index <= upper:
+            raise ValueError(f"Line {index} is out of range")
+
+        if op == "replace":
+            self._remove(index)
+            self._insert(index, text)
+        elif op == "insert":
+            self._insert(index, text)
+        elif op == "delete":
+            self._remove(index)
+        else:
+            raise ValueError(f"Unknown edit op '{op}'")
+
+    def analyze(self):
+        """
+        Returns:
+            dict: אותו מבנה כמו enhanced_content_analysis, מחושב מהמונים המצטברים
+        """
+        present = {term for term, count in self._term_lines.items() if count > 0}
+        tokens = []
+        analysis = {
+            "language": "unknown",
+            "script_type": "cuneiform",
+            "content_type": "unknown",
+            "key_terms": [],
+            "names": [],
+            "numbers": [number for features in self._features for number in features.numbers],
+            "dates": [],
+            "economic_terms": [term for term, form in ECONOMIC_TERMS if form in present],
+            "administrative_terms": [],
+            "cuneiform_words": [],
+            "xml_content": False
+        }
+
+        first_line = next((line.strip() for line in self.lines if line.strip()), "")
+        if first_line.startswith("<?xml") or _TEI_MARKER in present:
+            analysis["xml_content"] = True
+            if any(features.split_words for features in self._features):
+                # תג <w> שמתפרש על פני כמה שורות - החילוץ נעשה על הטקסט המלא
+                tokens = xml_tokens(self.text)
+            else:
+                tokens = [token for features in self._features for token in features.tokens]
+            if not tokens:
+                # בלי תגי <w> החילוץ נעשה לפי תגי <l> שיכולים להתפרש על פני כמה שורות
+                tokens = xml_tokens(self.text)
+            analysis["cuneiform_words"] = [token.word for token in tokens]
+            analysis = analyze_extracted_words(analysis, tokens)
+
+        for marker, language in LANGUAGE_MARKERS:
+            if marker in present:
+                analysis["language"] = language
+                break
+
+        if analysis["cuneiform_words"]:
+            analysis["content_type"] = determine_content_type_from_words(tokens)
+        elif analysis["economic_terms"]:
+            analysis["content_type"] = "כלכלי"
+
+        return {
+            "language": analysis["language"],
+            "content_type": analysis["content_type"],
+            "genre": match_rule_terms(present, _GENRE_RULES, GENRE_DEFAULT),
+            "period": match_rule_terms(present, _PERIOD_RULES, PERIOD_DEFAULT),
+            "structured_text": create_structured_summary(analysis, self.text),
+            "cuneiform_words": analysis["cuneiform_words"],
+            "economic_terms": analysis["economic_terms"],
+            "xml_content": analysis["xml_content"],
+            "analysis_data": analysis
+        }
+
+    def _insert(self, index, line):
+        features = line_features(line)
+        self.lines.insert(index, line)
+        self._features.insert(index, features)
+        self._term_lines.update(features.terms)
+
+    def _remove(self, index):
+        features = self._features.pop(index)
+        self.lines.pop(index)
+        self._term_lines.subtract(features.terms)
+
+
+def classification_signature(enhanced_analysis):
+    """
+    הערכים שמשפיעים על הסיווג - אם לא השתנו, אין צורך לפנות שוב למודל
+    """
+    return (
+        enhanced_analysis["genre"],
+        enhanced_analysis["period"],
+        enhanced_analysis["language"],
+        enhanced_analysis["content_type"],
+        tuple(enhanced_analysis["economic_terms"]),
+    )
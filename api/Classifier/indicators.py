@@ -0,0 +1,61 @@
+# api/Classifier/indicators.py
+
+from .normalization import canonical
+
+# כללי הסיווג - כל כלל הוא (תווית, סעיפים).
+# כלל מתקיים כאשר בכל סעיף מופיע לפחות אחד מהמונחים (AND של OR-ים).
+# הכללים מסודרים לפי עדיפות - הכלל הראשון שמתקיים קובע את התווית.
+
+GENRE_RULES = [
+    ("מסמך כלכלי - עסקת שעורים", [["gur", "barley", "še", "silver", "maš", "ĝa₂-ĝa₂", "interest"]]),
+    ("מסמך משפטי - אישור עסקה", [["ba-ti", "šu", "ib₂-ge-ne₂", "confirm"]]),
+    ("נוסחת תיארוך מלכותית", [["mu"], ["us₂-sa", "year"]]),
+    ("טקסט דתי או פולחני", [["dingir", "god", "temple", "e₂"]]),
+]
+GENRE_DEFAULT = "כתובת אדמיניסטרטיבית כללית"
+
+PERIOD_RULES = [
+    # תקופת אור השלישית
+    ("תקופת אור השלישית - שנת 35 לשולגי (כ-2059 לפנה״ס)", [["š 35", "anshan"]]),
+    # מערכת מידות של תקופת אור השלישית
+    ("תקופת אור השלישית (2112-2004 לפנה״ס)", [["gur"], ["še"]]),
+    # תקופה בבלית עתיקה
+    ("התקופה הבבלית העתיקה (1894-1594 לפנה״ס)", [["sin-muballit", "hammurabi", "rim-sin"]]),
+    # תקופה אשורית
+    ("התקופה האשורית החדשה (912-609 לפנה״ס)", [["aššur", "ninua", "kalhu"]]),
+    # מדד כללי לפי תוכן
+    ("תקופת אור השלישית או תקופה פליאו-בבלית (2100-1600 לפנה״ס)", [["%sux"]]),
+]
+PERIOD_DEFAULT = "תקופה לא מזוהה - דרושה בדיקה נוספת"
+
+
+def canonical_rules(rules):
+    """
+    נרמול מונחי הכללים לאותה צורה קנונית של הטקסט הנבדק
+    """
+    return [(label, [[canonical(term) for term in clause] for clause in clauses]) for label, clauses in rules]
+
+
+def match_rules(text, rules, default):
+    """
+    החזרת התווית של הכלל הראשון שמתקיים בטקסט
+
+    Args:
+        text (str): טקסט בצורה קנונית (NormalizedText.text)
+        rules (list): כללים אחרי canonical_rules
+        default (str): תווית כאשר אף כלל לא מתקיים
+    """
+    for label, clauses in rules:
+        if all(any(term in text for term in clause) for clause in clauses):
+            return label
+    return default
+
+
+def match_rule_terms(present_terms, rules, default):
+    """
+    כמו match_rules, אבל על קבוצת המונחים שנמצאו בטקסט במקום על הטקסט עצמו
+    """
+    for label, clauses in rules:
+        if all(any(term in present_terms for term in clause) for clause in clauses):
+            return label
+    return default
@@ -0,0 +1,160 @@
+# api/Classifier/normalization.py
+
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+# ספרות תחתיות -> ספרות רגילות, וגרסאות חלופיות של אותו סימן -> צורה אחת
+_CHAR_TABLE = str.maketrans({
+    **{chr(0x2080 + digit): str(digit) for digit in range(10)},
+    "ₓ": "x",
+    "ŋ": "ĝ",
+    "Ŋ": "Ĝ",
+    "ḫ": "h",
+    "Ḫ": "H",
+})
+
+# צירופי ASCII של ATF (sz, s, t,) ו-g עם טילדה מצרפית
+_DIGRAPHS = {
+    "sz": "š", "Sz": "Š", "SZ": "Š",
+    "s,": "ṣ", "S,": "Ṣ",
+    "t,": "ṭ", "T,": "Ṭ",
+    "h,": "h", "H,": "H",
+    "g\u0303": "ĝ", "G\u0303": "Ĝ",
+}
+# פסיק אחרי s/t/h נחשב לסימן ATF רק בהקשר של תעתיק: בתחילת סימן (אחרי תחילת מילה, רווח, מקף,
+# נקודה, סוגר או תג) כשהסימן ממשיך אחריו, או בסוף סימן כשאחריו מקף. בפרוזה ("This,that") הוא נשאר פסיק.
+# \x00 ו-\x01 הם גבולות בין טקסטים במנוע הווקטורי, ולכן גם הם תחילת סימן
+_DIGRAPH_PATTERN = re.compile(r"sz|Sz|SZ|(?<![^\s\-.{}(\[>⸢\x00\x01])[sStThH],(?=\w)|(?<=\w)[sStThH],(?=-)|[gG]\u0303")
+
+
+# מילים בקלט TEI: תוכן תגי <w>, ובלעדיהם המילים שבתוך תגי <l>
+_W_PATTERN = re.compile(r"<w[^>]*>(.*?)</w>", re.DOTALL)
+_L_PATTERN = re.compile(r"<l[^>]*>(.*?)</l>", re.DOTALL)
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+_SPACE_PATTERN = re.compile(r"\s+")
+_WORD_PATTERN = re.compile(r"\S+")
+# סוגריים מרובעים (שברים) ונקודות לא נחשבים חלק מהמילה
+_GAP_PATTERN = re.compile(r"[\[\]\.]+")
+
+
+class Token:
+    """
+    מילה אחת בקלט עם היסטים (start, end) לטקסט המקורי
+
+    word: המילה כפי שהיא מוצגת (בלי תגים, שברים ונקודות)
+    form: הצורה הקנונית באותיות קטנות, cased: הצורה הקנונית עם אותיות גדולות (לוגוגרמות).
+    שתי הצורות משותפות (interned) לכל מופע של אותה מילה.
+    """
+
+    __slots__ = ("word", "form", "cased", "start", "end")
+
+    def __init__(self, word, start, end):
+        self.word = word
+        self.form = canonical_token(word)
+        self.cased = canonical_token(word, fold=False)
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"Token({self.word!r}, {self.start}, {self.end})"
+
+
+class NormalizedText:
+    """
+    קלט מנורמל פעם אחת - כל המנתחים צורכים את אותו אובייקט
+
+    original: הטקסט כפי שהתקבל
+    text: הצורה הקנונית (אותיות קטנות) לחיפוש מונחים
+    is_xml: האם הקלט הוא מסמך XML/TEI
+    tokens: רצף המילים (Token) עם היסטים למקור - מילות ה-TEI במסמך XML, ומילים לפי רווחים בטקסט רגיל
+    """
+
+    def __init__(self, original):
+        self.original = original
+        self.text = canonical(original)
+        self.is_xml = original.strip().startswith("<?xml") or "<TEI" in original
+        self._tokens = None
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = xml_tokens(self.original) if self.is_xml else text_tokens(self.original)
+        return self._tokens
+
+    def __len__(self):
+        return len(self.original)
+
+    def __str__(self):
+        return self.original
+
+
+def canonical(text, fold=True):
+    """
+    צורה קנונית של תעתיק: NFC, ספרות רגילות במקום תחתיות, š/ṣ/ṭ/ĝ במקום צירופי ASCII
+
+    Args:
+        text (str): טקסט גולמי
+        fold (bool): האם להמיר לאותיות קטנות (False משמר לוגוגרמות באותיות גדולות)
+    """
+    text = unicodedata.normalize("NFC", text)
+    text = _DIGRAPH_PATTERN.sub(lambda match: _DIGRAPHS[match.group()], text)
+    text = text.translate(_CHAR_TABLE)
+    return text.lower() if fold else text
+
+
+@lru_cache(maxsize=65536)
+def canonical_token(token, fold=True):
+    """
+    נרמול טוקן בודד - תוצאה משותפת (interned) לכל מופע של אותו סימן
+    """
+    return sys.intern(canonical(token, fold))
+
+
+def w_tokens(text):
+    """
+    המילים שבתוך תגי <w>, לפי הסדר
+    """
+    tokens = []
+    for match in _W_PATTERN.finditer(text):
+        word = _TAG_PATTERN.sub("", _SPACE_PATTERN.sub(" ", match.group(1))).strip()
+        word = _GAP_PATTERN.sub("", word)
+        if word and word != "x":
+            tokens.append(Token(word, match.start(1), match.end(1)))
+    return tokens
+
+
+def xml_tokens(text):
+    """
+    המילים של מסמך TEI: תגי <w>, ואם אין כאלה - המילים שבתוך תגי <l>
+    (מילים של תו אחד בשורות נחשבות לסימני שבר או ספרות ומושמטות)
+    """
+    tokens = w_tokens(text)
+    if tokens:
+        return tokens
+    for line in _L_PATTERN.finditer(text):
+        # התגים מוחלפים ברווחים באותו אורך כדי שההיסטים יישארו נכונים
+        body = _TAG_PATTERN.sub(lambda tag: " " * len(tag.group()), line.group(1))
+        for match in _WORD_PATTERN.finditer(body):
+            word = _GAP_PATTERN.sub("", match.group())
+            if len(word) > 1:
+                tokens.append(Token(word, line.start(1) + match.start(), line.start(1) + match.end()))
+    return tokens
+
+
+def text_tokens(text):
+    """
+    מילים לפי רווחים, לטקסט שאינו XML
+    """
+    return [Token(match.group(), match.start(), match.end()) for match in _WORD_PATTERN.finditer(text)]
+
+
+def normalize(text):
+    """
+    Returns:
+        NormalizedText: הקלט המנורמל (אובייקט קיים מוחזר כמו שהוא)
+    """
+    if isinstance(text, NormalizedText):
+        return text
+    return NormalizedText(text)
@@ -0,0 +1,280 @@
+# api/Classifier/vectorized.py
+
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from .indicators import GENRE_RULES, GENRE_DEFAULT, PERIOD_RULES, PERIOD_DEFAULT, canonical_rules
+from .normalization import canonical
+
+# מפריד בין טקסטים במחרוזת המאוחדת - אף מונח לא מכיל אותו.
+# הופעה שלו בתוך טקסט מוחלפת בתו בקרה אחר שגם אותו אין באף מונח, כך שההתאמות לא משתנות
+_SEPARATOR = "\x00"
+_SEPARATOR_STANDIN = "\x01"
+
+# כלל בעדיפות גבוהה תמיד גובר על כל הכללים שמתחתיו
+_TIER_BASE = 2.0
+
+DEFAULT_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "classifier_weights.npz")
+
+
+class _Head:
+    """
+    ראש סיווג יחיד (ז׳אנר או תקופה) על גבי אוצר המילים המשותף
+
+    clauses = clip(X @ clause_weights, 0, 1)
+    scores  = clauses @ rule_weights + bias
+    learned = X @ term_weights - מכריע רק בטקסטים שבהם אף כלל לא התקיים
+    """
+
+    def __init__(self, labels, rule_labels, clause_weights, rule_weights, term_weights, bias):
+        self.labels = labels
+        self.rule_labels = rule_labels
+        self.clause_weights = clause_weights
+        self.rule_weights = rule_weights
+        self.term_weights = term_weights
+        self.bias = bias
+
+    def score(self, docs, terms, counts, n_texts):
+        clauses = np.minimum(_sparse_matmul(docs, terms, counts, n_texts, self.clause_weights), 1.0)
+        scores = clauses @ self.rule_weights + self.bias
+        best = scores.argmax(axis=1)
+        best_score = scores[np.arange(n_texts), best]
+        if self.term_weights.any():
+            learned = _sparse_matmul(docs, terms, counts, n_texts, self.term_weights)
+            use_learned = (best_score <= 0) & (learned.max(axis=1) > 0)
+            best = np.where(use_learned, learned.argmax(axis=1), best)
+            best_score = np.where(use_learned, learned.max(axis=1), best_score)
+        return self.rule_labels[best], best_score
+
+
+class VectorizedClassifier:
+    """
+    סיווג ז׳אנר ותקופה לאצוות של טקסטים בעזרת מטריצת מונחים דלילה וכפל מטריצות
+
+    Returns של classify_batch זהים לאלה של GenreClassifier/PeriodClassifier
+    עבור כללי ברירת המחדל, בתוספת ציון לכל טקסט
+    """
+
+    def __init__(self, vocab, genre, period):
+        self.vocab = list(vocab)
+        self.genre = genre
+        self.period = period
+        self._patterns = [re.compile(re.escape(term)) for term in self.vocab]
+
+    def term_counts(self, texts):
+        """
+        בניית מטריצת ספירות דלילה בפורמט COO
+
+        Returns:
+            tuple: (docs, terms, counts) - מערכים באורך מספר הרשומות שאינן אפס
+        """
+        # נרמול אחד לכל האצווה; הנרמול משנה אורכים, לכן גבולות הטקסטים נלקחים מהמפרידים
+        blob = canonical(_SEPARATOR.join(text.replace(_SEPARATOR, _SEPARATOR_STANDIN) for text in texts))
+        codepoints = np.frombuffer(blob.encode("utf-32-le"), dtype=np.uint32)
+        starts = np.concatenate(([0], np.flatnonzero(codepoints == 0) + 1))
+
+        docs, terms = [], []
+        for term_index, pattern in enumerate(self._patterns):
+            positions = np.fromiter((m.start() for m in pattern.finditer(blob)), dtype=np.int64)
+            if positions.size:
+                docs.append(np.searchsorted(starts, positions, side="right") - 1)
+                terms.append(np.full(positions.size, term_index, dtype=np.int64))
+
+        if not docs:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float64)
+
+        # איחוד מופעים חוזרים של אותו מונח באותו טקסט
+        keys = np.concatenate(docs) * len(self.vocab) + np.concatenate(terms)
+        keys, counts = np.unique(keys, return_counts=True)
+        return keys // len(self.vocab), keys % len(self.vocab), counts.astype(np.float64)
+
+    def score_batch(self, texts):
+        """
+        Returns:
+            dict: מערכי תוויות וציונים לז׳אנר ולתקופה, לפי סדר הטקסטים
+        """
+        texts = list(texts)
+        docs, terms, counts = self.term_counts(texts)
+        genre_index, genre_score = self.genre.score(docs, terms, counts, len(texts))
+        period_index, period_score = self.period.score(docs, terms, counts, len(texts))
+        return {
+            "genre": self.genre.labels[genre_index],
+            "genre_score": genre_score,
+            "period": self.period.labels[period_index],
+            "period_score": period_score,
+        }
+
+    def classify_batch(self, texts):
+        scores = self.score_batch(texts)
+        return [
+            {
+                "genre": str(genre),
+                "genre_score": float(genre_score),
+                "period": str(period),
+                "period_score": float(period_score),
+            }
+            for genre, genre_score, period, period_score in zip(
+                scores["genre"], scores["genre_score"], scores["period"], scores["period_score"]
+            )
+        ]
+
+    def save(self, path=DEFAULT_WEIGHTS_PATH):
+        arrays = {"vocab": np.array(self.vocab)}
+        for name, head in (("genre", self.genre), ("period", self.period)):
+            arrays[f"{name}_labels"] = head.labels
+            arrays[f"{name}_rule_labels"] = head.rule_labels
+            arrays[f"{name}_clause_weights"] = head.clause_weights
+            arrays[f"{name}_rule_weights"] = head.rule_weights
+            arrays[f"{name}_term_weights"] = head.term_weights
+            arrays[f"{name}_bias"] = head.bias
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path=DEFAULT_WEIGHTS_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            heads = {
+                name: _Head(
+                    data[f"{name}_labels"],
+                    data[f"{name}_rule_labels"],
+                    data[f"{name}_clause_weights"],
+                    data[f"{name}_rule_weights"],
+                    data[f"{name}_term_weights"],
+                    data[f"{name}_bias"],
+                )
+                for name in ("genre", "period")
+            }
+            return cls(data["vocab"].tolist(), heads["genre"], heads["period"])
+
+    @classmethod
+    def from_rules(cls, extra_vocab=()):
+        """
+        הידור כללי indicators.py למטריצות משקלים
+        """
+        genre_rules = canonical_rules(GENRE_RULES)
+        period_rules = canonical_rules(PERIOD_RULES)
+        vocab = []
+        for _, clauses in genre_rules + period_rules:
+            for clause in clauses:
+                vocab.extend(term for term in clause if term not in vocab)
+        vocab.extend(canonical(term) for term in extra_vocab if canonical(term) not in vocab)
+        genre = _compile_rules(genre_rules, GENRE_DEFAULT, vocab)
+        period = _compile_rules(period_rules, PERIOD_DEFAULT, vocab)
+        return cls(vocab, genre, period)
+
+    def learn_ngrams(self, texts, genre_labels, period_labels, top_k=64):
+        """
+        למידת n-grams של סימנים (סימן בודד וזוג סימנים) מטקסטים מתויגים
+
+        משקלי n-grams מכריעים רק כאשר אף כלל מפורש לא מתקיים
+
+        Returns:
+            VectorizedClassifier: מסווג חדש עם אוצר מילים מורחב
+        """
+        ngram_counts = Counter(ngram for text in texts for ngram in set(sign_ngrams(text)))
+        learned = [ngram for ngram, _ in ngram_counts.most_common() if ngram not in self.vocab][:top_k]
+        engine = VectorizedClassifier.from_rules(extra_vocab=list(self.vocab) + learned)
+        n_rule_terms = len(VectorizedClassifier.from_rules().vocab)
+
+        docs, terms, counts = engine.term_counts(texts)
+        for head, labels in ((engine.genre, genre_labels), (engine.period, period_labels)):
+            head.term_weights = _naive_bayes_weights(head, docs, terms, counts, labels, len(engine.vocab))
+            # מונחי הכללים המפורשים כבר מטופלים על ידי clause_weights
+            head.term_weights[:n_rule_terms] = 0
+        return engine
+
+
+def sign_ngrams(text):
+    """
+    פירוק טקסט לסימנים (לפי מקפים ורווחים) והחזרת סימנים בודדים וזוגות סימנים
+    """
+    for word in canonical(text).split():
+        signs = [sign for sign in word.split("-") if sign]
+        for i, sign in enumerate(signs):
+            if len(sign) > 1:
+                yield sign
+            if i + 1 < len(signs):
+                yield f"{sign}-{signs[i + 1]}"
+
+
+def load_engine(path=None):
+    """
+    טעינת המסווג מקובץ משקלים, או הידור הכללים אם הקובץ לא קיים
+    """
+    path = path or os.environ.get("CLASSIFIER_WEIGHTS_PATH", DEFAULT_WEIGHTS_PATH)
+    if os.path.exists(path):
+        return VectorizedClassifier.load(path)
+    return VectorizedClassifier.from_rules()
+
+
+def _compile_rules(rules, default, vocab):
+    """
+    כל סעיף הוא עמודה ב-clause_weights; כלל מקבל ציון חיובי רק אם כל סעיפיו מתקיימים
+    """
+    term_index = {term: i for i, term in enumerate(vocab)}
+    n_clauses = sum(len(clauses) for _, clauses in rules)
+    clause_weights = np.zeros((len(vocab), n_clauses))
+    rule_weights = np.zeros((n_clauses, len(rules) + 1))
+    bias = np.zeros(len(rules) + 1)
+
+    column = 0
+    for rule_index, (_, clauses) in enumerate(rules):
+        tier = _TIER_BASE ** (len(rules) - rule_index)
+        for clause in clauses:
+            for term in clause:
+                clause_weights[term_index[term], column] = 1.0
+            rule_weights[column, rule_index] = tier
+            column += 1
+        bias[rule_index] = -tier * (len(clauses) - 0.5)
+
+    labels = []
+    for label, _ in rules:
+        if label not in labels:
+            labels.append(label)
+    labels.append(default)
+    rule_labels = np.array([labels.index(label) for label, _ in rules] + [len(labels) - 1])
+    term_weights = np.zeros((len(vocab), len(rules) + 1))
+    return _Head(np.array(labels), rule_labels, clause_weights, rule_weights, term_weights, bias)
+
+
+def _naive_bayes_weights(head, docs, terms, counts, labels, n_terms):
+    """
+    משקלי log-odds חיוביים (Naive Bayes רב-שמי) לכל מונח ותווית
+    """
+    label_index = {str(label): i for i, label in enumerate(head.labels)}
+    targets = np.array([label_index.get(label, len(head.labels) - 1) for label in labels])
+    # עמודת הכלל הראשון של כל תווית מקבלת את המשקל הנלמד
+    columns = [int(np.flatnonzero(head.rule_labels == i)[0]) for i in range(len(head.labels))]
+
+    totals = np.ones((n_terms, len(head.labels)))
+    np.add.at(totals, (terms, targets[docs]), counts)
+    log_probs = np.log(totals / totals.sum(axis=0))
+    log_odds = log_probs - log_probs.mean(axis=1, keepdims=True)
+    log_odds = np.clip(log_odds, 0, None)
+    # מונח שלא נצפה באימון לא מקבל משקל
+    log_odds[np.bincount(terms, minlength=n_terms) == 0] = 0
+
+    term_weights = np.zeros((n_terms, head.rule_weights.shape[1]))
+    term_weights[:, columns] = log_odds
+    return term_weights
+
+
+def _sparse_matmul(docs, terms, counts, n_rows, weights):
+    """
+    כפל מטריצה דלילה (COO) במטריצה צפופה, עמודה אחר עמודה בעזרת bincount
+    """
+    result = np.zeros((n_rows, weights.shape[1]))
+    if docs.size == 0:
+        return result
+    for column in np.flatnonzero(weights.any(axis=0)):
+        values = counts * weights[terms, column]
+        result[:, column] = np.bincount(docs, weights=values, minlength=n_rows)
+    return result
+
+
+if __name__ == "__main__":
+    VectorizedClassifier.from_rules().save()
+    print(f"נשמר קובץ משקלים: {DEFAULT_WEIGHTS_PATH}")
@@ -1,11 +1,14 @@
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 import json
 import time
 import logging
 import sys
 import os
-import base64
+import threading
+import multiprocessing
+import hmac
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 def safe_json_text(text):
     if text:
@@ -13,13 +16,6 @@ def safe_json_text(text):
         text = text.replace('\x00', '')
     return text
 
-creds_b64 = os.getenv("GOOGLE_CREDENTIALS_B64")
-if creds_b64:
-    creds_json = base64.b64decode(creds_b64).decode("utf-8")
-    with open("/tmp/credentials.json", "w") as f:
-        f.write(creds_json)
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "/tmp/credentials.json"
-
 app = Flask(__name__)
 CORS(app)
 
@@ -38,16 +34,24 @@ sys.path.insert(0, classifier_path)
 
 # Import Gemini
 try:
-    from gemini import Gemini # type: ignore
+    from gemini import Gemini, StubGemini # type: ignore
     logger.info("✅ Successfully imported Gemini")
 except ImportError as e:
     logger.error(f"❌ Failed to import Gemini: {e}")
     logger.error(f"Trying to import from: {server_path}")
     raise
 
+from jobs import JobQueueFull, create_job_manager # type: ignore
+from streams import create_stream_registry, parse_last_event_id # type: ignore
+from history import create_analysis_history # type: ignore
+from profiling import RequestProfiler, profile_path # type: ignore
+from sessions import create_session_store # type: ignore
+from admission import Overloaded, create_admission_controller # type: ignore
+from prefork import in_prefork_worker, memory_report # type: ignore
+
 # Import classifier components
 try:
-    from Classifier.classifier import GenreClassifier, PeriodClassifier
+    from Classifier.classifier import GenreClassifier, PeriodClassifier, model_weight_bytes
     from Classifier.controller import (
         extract_transliteration, 
         analyze_cuneiform_text, 
@@ -59,6 +63,9 @@ except ImportError as e:
     logger.warning(f"⚠️ Classifier import failed: {e}. Using fallback classification.")
     CLASSIFIER_AVAILABLE = False
     
+    def model_weight_bytes():
+        return 0
+    
     # Define fallback classes
     class GenreClassifier:
         def classify(self, text):
@@ -79,9 +86,9 @@ except ImportError as e:
             self.Period = period
             self.StructuredData = structured_data
     
-    def extract_transliteration(input_text, input_type):
+    def extract_transliteration(input_text, input_type, analysis=None):
         return TransliterationResult(
-            text=input_text[:500] + "...",
+            text=str(input_text),
             genre="כתובת יתדות",
             period="מסופוטמיה עתיקה",
             structured_data={"fallback": True}
@@ -90,35 +97,172 @@ except ImportError as e:
     def analyze_cuneiform_text(text):
         return {"language": "unknown", "content_type": "unknown", "fallback": True}
 
+from Classifier.normalization import normalize
+from Classifier.chunking import chunk_text
+
+# Import the vectorized batch classifier
+try:
+    from Classifier.vectorized import load_engine
+    batch_classifier = load_engine()
+    logger.info("✅ Loaded vectorized batch classifier")
+except ImportError as e:
+    logger.warning(f"⚠️ Vectorized classifier unavailable: {e}")
+    batch_classifier = None
+
+# Models used by the analysis endpoints - warmed up at boot
+DEFAULT_MODELS = ["gemini-2.0-flash", "gemini-2.5-pro-preview-05-06"]
+
+# GEMINI_BACKEND=stub swaps the API for an offline stub that only records the payloads
+GEMINI_CLIENT = StubGemini if os.environ.get("GEMINI_BACKEND") == "stub" else Gemini
+
+# Fixed instructions - set once per model client, so each call only sends the inscription data
+DEEP_SYSTEM_INSTRUCTIONS = {
+    'he': """אתה חוקר אקדמי בפיגרפיה (מחקר כתובות עתיקות) ובכתב יתדות.
+ספק ניתוח מקצועי ומדעי של הכתובת שתישלח אליך, יחד עם המידע מהניתוח הטכני שלה.
+
+אנא ספק:
+1. הקשר היסטורי ותרבותי
+2. ניתוח לשוני של המילים שזוהו
+3. משמעות התוכן והחשיבות הארכיאולוגית
+4. פרטים על התקופה והמקום הגיאוגרפי
+5. השוואה לכתובות דומות מהתקופה
+
+התייחס לרמה אקדמית אך נגישה לקורא המשכיל. התחל ישירות עם הניתוח ללא נוסחאות פתיחה.""",
+    'en': """You are an expert in epigraphy and cuneiform studies.
+Provide a professional analysis of the ancient inscription you are sent, together with its technical analysis data.
+
+Please provide:
+1. Historical and cultural context
+2. Linguistic analysis of identified terms
+3. Content significance and archaeological importance
+4. Details about period and geographical location
+5. Comparison to similar inscriptions
+
+Academic level but accessible to educated readers."""
+}
+
+QUICK_SYSTEM_INSTRUCTIONS = {
+    language: f"""{'בעברית:' if language == 'he' else 'In English:'}
+ספק הערכה ראשונית קצרה (2-3 משפטים) של כתובת היתדות שהז׳אנר והתקופה שלה יישלחו אליך.
+התמקד בסוג הכתובת, התקופה הסבירה, והנושא העיקרי."""
+    for language in ('he', 'en')
+}
+
+# Map step of the chunked mode - each section of a large input is summarized on its own
+CHUNK_SYSTEM_INSTRUCTIONS = {
+    'he': """אתה חוקר אקדמי בפיגרפיה (מחקר כתובות עתיקות) ובכתב יתדות.
+תקבל קטע אחד מתוך כתובת ארוכה, שורה אחרי שורה, כאשר כל משטח מתחיל בשמו בסוגריים מרובעים.
+סכם את הקטע בקצרה ובאופן עובדתי: נושאים, מונחים ושמות מרכזיים, מספרים ותאריכים, ומצב ההשתמרות.
+הסיכום ישולב עם סיכומי שאר הקטעים לניתוח אחד, לכן אל תוסיף פתיחה או מסקנות כלליות.""",
+    'en': """You are an expert in epigraphy and cuneiform studies.
+You will receive one section of a long inscription, line by line, with each surface starting with its name in square brackets.
+Summarize the section briefly and factually: topics, key terms and names, numbers and dates, and state of preservation.
+The summary will be combined with the summaries of the other sections into one analysis, so add no introduction or general conclusions."""
+}
+
+# Inputs longer than this are analyzed in chunks (map-reduce) instead of one prompt
+CHUNK_THRESHOLD_CHARS = int(os.environ.get("CHUNK_THRESHOLD_CHARS", 20000))
+CHUNK_MAX_CHARS = int(os.environ.get("CHUNK_MAX_CHARS", 8000))
+chunk_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("CHUNK_WORKERS", 8)), thread_name_prefix="chunk")
+
+def chunk_instruction(language):
+    return CHUNK_SYSTEM_INSTRUCTIONS['he' if language == 'he' else 'en']
+
+# The instructions each model is actually called with - the warm-up prepares only these
+MODEL_INSTRUCTIONS = {
+    "gemini-2.0-flash": (DEEP_SYSTEM_INSTRUCTIONS, QUICK_SYSTEM_INSTRUCTIONS, CHUNK_SYSTEM_INSTRUCTIONS),
+    "gemini-2.5-pro-preview-05-06": (DEEP_SYSTEM_INSTRUCTIONS,),
+}
+
+def deep_instruction(language):
+    return DEEP_SYSTEM_INSTRUCTIONS['he' if language == 'he' else 'en']
+
+def quick_instruction(language):
+    return QUICK_SYSTEM_INSTRUCTIONS['he' if language == 'he' else 'en']
+
+# Import incremental re-analysis for editing sessions
+try:
+    from Classifier.incremental import IncrementalAnalysis, classification_signature
+    SESSIONS_AVAILABLE = True
+except ImportError as e:
+    logger.warning(f"⚠️ Incremental analysis unavailable: {e}")
+    SESSIONS_AVAILABLE = False
+
+# Import corpus mode (one result per document in a multi-document TEI file)
+try:
+    from Classifier.corpus import analyze_corpus
+    CORPUS_AVAILABLE = True
+except ImportError as e:
+    logger.warning(f"⚠️ Corpus analysis unavailable: {e}")
+    CORPUS_AVAILABLE = False
+
 class AppState:
     def __init__(self):
         self.gemini_available = False
         self.gemini_models = {}
         self.last_error = None
         self.classifier_available = CLASSIFIER_AVAILABLE
+        self.warmup_models = []
+        self.warmup_done = threading.Event()
+        self._models_lock = threading.Lock()
+        self._init_locks = {}
 
     def get_gemini_model(self, model_name):
-        try:
-            if model_name not in self.gemini_models:
+        model = self.gemini_models.get(model_name)
+        if model is not None:
+            return model
+        
+        # One lock per model: concurrent first requests (and the warm-up thread)
+        # wait for a single initialization instead of each creating a client
+        with self._models_lock:
+            init_lock = self._init_locks.setdefault(model_name, threading.Lock())
+        
+        with init_lock:
+            if model_name in self.gemini_models:
+                return self.gemini_models[model_name]
+            try:
                 logger.info(f"Initializing Gemini model: {model_name}")
-                self.gemini_models[model_name] = Gemini().init_model(model_name)
+                self.gemini_models[model_name] = GEMINI_CLIENT().init_model(model_name)
                 self.gemini_available = True
                 logger.info(f"Successfully initialized {model_name}")
-            return self.gemini_models[model_name]
-        except Exception as e:
-            self.gemini_available = False
-            self.last_error = str(e)
-            logger.error(f"Failed to initialize {model_name}: {e}")
-            raise e
+                return self.gemini_models[model_name]
+            except Exception as e:
+                self.gemini_available = False
+                self.last_error = str(e)
+                logger.error(f"Failed to initialize {model_name}: {e}")
+                raise e
+    
+    def start_warmup(self, model_names):
+        """Initialize the given models in a background thread"""
+        self.warmup_models = list(model_names)
+        
+        def warmup():
+            for model_name in self.warmup_models:
+                try:
+                    model = self.get_gemini_model(model_name)
+                    for instructions in MODEL_INSTRUCTIONS.get(model_name, ()):
+                        for instruction in instructions.values():
+                            model.prepare_system_instruction(instruction)
+                except Exception:
+                    pass  # already logged; requests will retry the initialization
+            self.warmup_done.set()
+        
+        threading.Thread(target=warmup, name="gemini-warmup", daemon=True).start()
     
     def is_gemini_available(self):
         return self.gemini_available
     
+    def is_ready(self):
+        return self.warmup_done.is_set() and all(name in self.gemini_models for name in self.warmup_models)
+    
     def get_status(self):
         return {
             'gemini_available': self.gemini_available,
             'classifier_available': self.classifier_available,
             'loaded_models': list(self.gemini_models.keys()),
+            'warmup_models': self.warmup_models,
+            'warmup_done': self.warmup_done.is_set(),
+            'ready': self.is_ready(),
             'last_error': self.last_error
         }
 
@@ -127,14 +271,108 @@ def safe_json_dumps(data):
 
 # Global app state
 app_state = AppState()
+# Corpus worker processes re-import this file as their main module - the warm-up only
+# belongs in the server process
+if multiprocessing.current_process().name == 'MainProcess':
+    app_state.start_warmup([name for name in os.environ.get("WARMUP_MODELS", ",".join(DEFAULT_MODELS)).split(",") if name])
+stream_registry = create_stream_registry()
+analysis_history = create_analysis_history()
+session_store = create_session_store()
+admission_controller = create_admission_controller()
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/epigraph_profiles")
+
+def profiling_requested():
+    """
+    Profiling is opt-in per request (X-Profile: 1 or ?profile=1) and needs X-Admin-Token
+
+    Returns:
+        tuple: (requested, error_response) - error_response is set when the token is missing or wrong
+    """
+    if request.headers.get('X-Profile') != '1' and request.args.get('profile') != '1':
+        return False, None
+    admin_token = os.environ.get('PROFILE_ADMIN_TOKEN')
+    if not admin_token or not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return False, (jsonify({'error': 'Profiling requires a valid admin token'}), 403)
+    return True, None
+
+def finish_profile(profiler, timings):
+    profiler.stop()
+    profiler.save(PROFILE_DIR)
+    return profiler.report(stages=timings)
+
+# Priority class of each route - routes not listed here (stream resumes, job polls,
+# metrics) only read existing state and skip admission
+ROUTE_PRIORITIES = {
+    'health': 'cheap',
+    'ready': 'cheap',
+    'test_classifier': 'cheap',
+    'classify_batch': 'cheap',
+    'list_analyses': 'cheap',
+    'download_profile': 'cheap',
+    # Only queues the job - jobs run on their own bounded pool and backlog (JOB_WORKERS, JOB_QUEUE_LIMIT)
+    'create_job': 'cheap',
+    # The stream is admitted for its preview only - the deep stage takes its own deep slot
+    'query_stream': 'interactive',
+    'query': 'interactive',
+    'create_session': 'interactive',
+    'edit_session': 'interactive',
+    'test_models': 'interactive',
+    'analyze_corpus_file': 'deep',
+}
+
+@app.before_request
+def admit_request():
+    priority = ROUTE_PRIORITIES.get(request.endpoint)
+    if priority is None or request.method == 'OPTIONS':
+        return None
+    if request.endpoint == 'query_stream':
+        stream_id, _ = parse_last_event_id(request.headers.get('Last-Event-ID'))
+        if stream_id and stream_registry.get(stream_id) is not None:
+            return None
+    try:
+        g.admission_ticket = admission_controller.acquire(priority)
+    except Overloaded as e:
+        logger.warning(f"Shedding {request.path}: {e.reason}")
+        return overloaded_response(e.retry_after)
+    return None
+
+def overloaded_response(retry_after):
+    response = jsonify({'error': 'Server is overloaded, please retry later', 'retry_after': retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.teardown_request
+def release_admission(exc):
+    ticket = g.pop('admission_ticket', None)
+    if ticket is not None:
+        ticket.release()
+
+def take_admission_ticket():
+    """
+    Detach the request's admission slot for work that outlives the request (stream producers)
+    - the caller must release it when that work finishes
+    """
+    return g.pop('admission_ticket', None)
+
+def record_analysis(endpoint, text_data, language, enhanced_analysis, model_outputs, timings):
+    try:
+        analysis_history.record(endpoint, text_data, language, enhanced_analysis, model_outputs, timings)
+    except Exception as e:
+        logger.error(f"Failed to record analysis history: {e}")
 
 def enhanced_content_analysis(text_data):
     try:
+        # Normalize once - every analyzer below consumes the same canonical text
+        normalized = normalize(text_data)
+        
         logger.info("Running cuneiform analysis...")
-        cuneiform_analysis = analyze_cuneiform_text(text_data)
+        cuneiform_analysis = analyze_cuneiform_text(normalized)
         
         logger.info("Extracting transliteration...")
-        transliteration_result = extract_transliteration(text_data, "xml" if "<" in text_data else "text")
+        transliteration_result = extract_transliteration(normalized, "xml" if "<" in text_data else "text",
+                                                         analysis=cuneiform_analysis)
         
         enhanced_analysis = {
             'language': cuneiform_analysis.get('language', 'unknown'),
@@ -158,7 +396,7 @@ def enhanced_content_analysis(text_data):
             'content_type': 'cuneiform inscription',
             'genre': 'כתובת יתדות',
             'period': 'תקופה עתיקה',
-            'structured_text': text_data[:500] + "...",
+            'structured_text': text_data,
             'cuneiform_words': [],
             'economic_terms': [],
             'xml_content': '<' in text_data,
@@ -166,59 +404,32 @@ def enhanced_content_analysis(text_data):
         }
 
 def create_intelligent_prompt(enhanced_analysis, language='he'):
+    # Only the per-inscription part - the instructions are DEEP_SYSTEM_INSTRUCTIONS
     structured_text = enhanced_analysis['structured_text']
     
     if language == 'he':
-        prompt = f"""
-אתה חוקר אקדמי בפיגרפיה (מחקר כתובות עתיקות) ובכתב יתדות. 
-ספק ניתוח מקצועי ומדעי של הכתובת הבאה:
-
-{structured_text}
+        prompt = f"""{structured_text}
 
 מידע נוסף מהניתוח הטכני:
 • ז׳אנר: {enhanced_analysis['genre']}
 • תקופה: {enhanced_analysis['period']}
 • שפה: {enhanced_analysis['language']}
-• סוג תוכן: {enhanced_analysis['content_type']}
-
-אנא ספק:
-1. הקשר היסטורי ותרבותי
-2. ניתוח לשוני של המילים שזוהו
-3. משמעות התוכן והחשיבות הארכיאולוגית
-4. פרטים על התקופה והמקום הגיאוגרפי
-5. השוואה לכתובות דומות מהתקופה
-
-התייחס לרמה אקדמית אך נגישה לקורא המשכיל. התחל ישירות עם הניתוח ללא נוסחאות פתיחה.
-        """
+• סוג תוכן: {enhanced_analysis['content_type']}"""
     else:
-        prompt = f"""
-You are an expert in epigraphy and cuneiform studies.
-Provide a professional analysis of this ancient inscription:
-
-{structured_text}
+        prompt = f"""{structured_text}
 
 Technical analysis data:
 • Genre: {enhanced_analysis['genre']}
 • Period: {enhanced_analysis['period']}
 • Language: {enhanced_analysis['language']}
-• Content type: {enhanced_analysis['content_type']}
-
-Please provide:
-1. Historical and cultural context
-2. Linguistic analysis of identified terms
-3. Content significance and archaeological importance
-4. Details about period and geographical location
-5. Comparison to similar inscriptions
-
-Academic level but accessible to educated readers.
-        """
+• Content type: {enhanced_analysis['content_type']}"""
     
     return prompt
 
-def safe_ai_call(model_name, prompt, fallback_message="Analysis unavailable"):
+def safe_ai_call(model_name, prompt, fallback_message="Analysis unavailable", system_instruction=None):
     try:
         model = app_state.get_gemini_model(model_name)
-        result = model.ask(prompt, short_answer=False)
+        result = model.ask(prompt, short_answer=False, system_instruction=system_instruction)
         if result: result = safe_json_text(result)
         return result if result else fallback_message
     except Exception as e:
@@ -261,8 +472,202 @@ Technical Information:
     
     return summary
 
+def create_chunk_prompt(chunk, number, total, enhanced_analysis, language='he'):
+    if language == 'he':
+        return f"""קטע {number} מתוך {total}
+ז׳אנר: {enhanced_analysis['genre']}
+תקופה: {enhanced_analysis['period']}
+
+{chunk}"""
+    return f"""Section {number} of {total}
+Genre: {enhanced_analysis['genre']}
+Period: {enhanced_analysis['period']}
+
+{chunk}"""
+
+def create_reduce_prompt(enhanced_analysis, summaries, language='he'):
+    # Same payload as create_intelligent_prompt, with the section summaries in place of the full text
+    if language == 'he':
+        sections = "\n\n".join(
+            f"קטע {number}:\n{summary}" if summary else f"קטע {number}: (הניתוח של הקטע לא הושלם)"
+            for number, summary in enumerate(summaries, 1)
+        )
+        return f"""הכתובת ארוכה ולכן נותחה ב-{len(summaries)} קטעים. סיכומי הקטעים לפי הסדר:
+
+{sections}
+
+מידע נוסף מהניתוח הטכני:
+• ז׳אנר: {enhanced_analysis['genre']}
+• תקופה: {enhanced_analysis['period']}
+• שפה: {enhanced_analysis['language']}
+• סוג תוכן: {enhanced_analysis['content_type']}
+• מילים בכתב יתדות שזוהו: {len(enhanced_analysis['cuneiform_words'])}"""
+    sections = "\n\n".join(
+        f"Section {number}:\n{summary}" if summary else f"Section {number}: (analysis of this section did not complete)"
+        for number, summary in enumerate(summaries, 1)
+    )
+    return f"""The inscription is long, so it was analyzed in {len(summaries)} sections. Section summaries in order:
+
+{sections}
+
+Technical analysis data:
+• Genre: {enhanced_analysis['genre']}
+• Period: {enhanced_analysis['period']}
+• Language: {enhanced_analysis['language']}
+• Content type: {enhanced_analysis['content_type']}
+• Cuneiform words identified: {len(enhanced_analysis['cuneiform_words'])}"""
+
+def analyze_in_chunks(chunks, enhanced_analysis, language, model_name, fallback_message):
+    """
+    Map-reduce analysis of a large input split by chunk_text(): every chunk is summarized in
+    parallel by the fast model, then model_name combines the summaries. Yields one progress
+    event per finished chunk and returns the combined analysis.
+    """
+    yield {'type': 'status', 'stage': 'chunking', 'chunks': len(chunks)}
+    
+    futures = {
+        chunk_executor.submit(safe_ai_call, "gemini-2.0-flash",
+                              create_chunk_prompt(chunk, number, len(chunks), enhanced_analysis, language),
+                              None, system_instruction=chunk_instruction(language)): number
+        for number, chunk in enumerate(chunks, 1)
+    }
+    summaries = [None] * len(chunks)
+    for completed, future in enumerate(as_completed(futures), 1):
+        number = futures[future]
+        summaries[number - 1] = future.result()
+        yield {'type': 'chunk_progress', 'chunk': number, 'total': len(chunks), 'completed': completed,
+               'status': 'done' if summaries[number - 1] else 'failed'}
+    
+    if not any(summaries):
+        return fallback_message
+    yield {'type': 'status', 'stage': 'reducing'}
+    return safe_ai_call(model_name, create_reduce_prompt(enhanced_analysis, summaries, language),
+                        fallback_message, system_instruction=deep_instruction(language))
+
+def deep_analysis(text_data, enhanced_analysis, language, model_name, fallback_message):
+    """
+    The detailed analysis - one call, or analyze_in_chunks for inputs over CHUNK_THRESHOLD_CHARS.
+    A generator either way: use `yield from` to stream the progress, or run_to_completion().
+    """
+    if len(text_data) > CHUNK_THRESHOLD_CHARS:
+        # The threshold is on the raw input - without its markup it may still fit one chunk,
+        # and then the single prompt is cheaper than a map call plus a reduce call
+        chunks = chunk_text(text_data, CHUNK_MAX_CHARS)
+        if len(chunks) > 1:
+            return (yield from analyze_in_chunks(chunks, enhanced_analysis, language, model_name, fallback_message))
+    return safe_ai_call(model_name, create_intelligent_prompt(enhanced_analysis, language),
+                        fallback_message, system_instruction=deep_instruction(language))
+
+def run_to_completion(generator):
+    while True:
+        try:
+            next(generator)
+        except StopIteration as done:
+            return done.value
+
+def create_quick_prompt(enhanced_analysis, language='he'):
+    # Only the per-inscription part - the instructions are QUICK_SYSTEM_INSTRUCTIONS
+    return f"""ז׳אנר: {enhanced_analysis['genre']}
+תקופה: {enhanced_analysis['period']}"""
+
+def build_final_results(enhanced_analysis, quick_result, detailed_analysis, text_data, language='he'):
+    classification_summary = create_classification_summary(enhanced_analysis, language)
+    
+    return {
+        'summary': quick_result,
+        'language': language,
+        'preprocessing': {
+            'status': 'success',
+            'preview': quick_result,
+            'language': language,
+            'classifier_used': True
+        },
+        'tabs': [
+            {
+                'name': 'Detailed Analysis' if language == 'en' else 'ניתוח מפורט',
+                'content': detailed_analysis
+            },
+            {
+                'name': 'Advanced Classification' if language == 'en' else 'סיווג מתקדם',
+                'content': classification_summary
+            },
+            {
+                'name': 'Cuneiform Words' if language == 'en' else 'מילים בכתב יתדות',
+                'content': f"{'Identified cuneiform terms:' if language == 'en' else 'מונחים בכתב יתדות שזוהו:'}\n\n" + 
+                         "\n".join([f"• {word}" for word in enhanced_analysis['cuneiform_words'][:20]]) if enhanced_analysis['cuneiform_words'] 
+                         else ('No cuneiform words identified in this text.' if language == 'en' else 'לא זוהו מילים בכתב יתדות בטקסט זה.')
+            },
+            {
+                'name': 'Technical Details' if language == 'en' else 'פרטים טכניים',
+                'content': f"AI Status: {'Available' if app_state.is_gemini_available() else 'Limited'}\n"
+                         f"Classifier: {'Available' if app_state.get_status()['classifier_available'] else 'Limited'}\n"
+                         f"Processed: {len(text_data)} characters\n"
+                         f"Language: {language}\n"
+                         f"Models: {', '.join(app_state.gemini_models.keys())}\n"
+                         f"XML Content: {'Yes' if enhanced_analysis['xml_content'] else 'No'}"
+            }
+        ]
+    }
+
+def run_full_analysis(text_data, language='he'):
+    """
+    Run the whole pipeline without streaming - classification, quick preview and deep analysis
+    """
+    timings = {}
+    start = time.time()
+    enhanced_analysis = enhanced_content_analysis(text_data)
+    timings['classification'] = time.time() - start
+    
+    stage_start = time.time()
+    quick_prompt = create_quick_prompt(enhanced_analysis, language)
+    quick_result = safe_ai_call("gemini-2.0-flash", quick_prompt, 
+                              "Quick analysis unavailable. Enhanced classification available below.",
+                              system_instruction=quick_instruction(language))
+    timings['quick_preview'] = time.time() - stage_start
+    
+    stage_start = time.time()
+    detailed_analysis = run_to_completion(deep_analysis(text_data, enhanced_analysis, language,
+                                                        "gemini-2.5-pro-preview-05-06",
+                                                        "Detailed analysis unavailable. Classification provided."))
+    timings['deep_analysis'] = time.time() - stage_start
+    timings['total'] = time.time() - start
+    
+    record_analysis('/api/jobs', text_data, language, enhanced_analysis,
+                    {'gemini-2.0-flash': quick_result, 'gemini-2.5-pro-preview-05-06': detailed_analysis}, timings)
+    
+    return build_final_results(enhanced_analysis, quick_result, detailed_analysis, text_data, language)
+
+def stream_response(stream, after_seq=0):
+    # Every event carries '<stream_id>:<seq>' so a reconnect can resume via Last-Event-ID
+    def generate():
+        for seq, payload in stream.read(after_seq):
+            yield f"id: {stream.stream_id}:{seq}\ndata: {safe_json_dumps(payload)}\n\n"
+
+    return Response(generate(),
+                   content_type='text/plain; charset=utf-8',
+                   headers={
+                       'Cache-Control': 'no-cache',
+                       'Connection': 'keep-alive',
+                       'Access-Control-Allow-Origin': '*'
+                   })
+
+def worker_state_not_found(message):
+    # Sessions and streams live in one worker's memory - under api/serve.py the request may have reached another
+    body = {'error': message}
+    if in_prefork_worker():
+        body['hint'] = 'Kept by the worker process that created it - run api/serve.py with WEB_WORKERS=1 to use it'
+    return jsonify(body), 404
+
 @app.route('/api/query-stream', methods=['POST'])
 def query_stream():
+    # Reconnects attach to the analysis that is still running instead of starting a new one
+    stream_id, last_seq = parse_last_event_id(request.headers.get('Last-Event-ID'))
+    if stream_id:
+        stream = stream_registry.get(stream_id)
+        if stream is not None:
+            logger.info(f"Resuming stream {stream_id} after event {last_seq}")
+            return stream_response(stream, last_seq)
+    
     try:
         data = request.get_json()
         if not data:
@@ -276,35 +681,43 @@ def query_stream():
         logger.error(f"Request parsing error: {e}")
         return jsonify({'error': 'Invalid request format'}), 400
     
+    profile, error_response = profiling_requested()
+    if error_response:
+        return error_response
+    
+    admission_ticket = take_admission_ticket()
+    
     def generate():
+        profiler = RequestProfiler().start() if profile else None
+        ticket = admission_ticket
         try:
+            timings = {}
+            start = time.time()
+            
             # Step 1: Start with initializing
-            yield f"data: {safe_json_dumps({'type': 'status', 'stage': 'initializing' })}\n\n"
+            yield {'type': 'status', 'stage': 'initializing'}
             time.sleep(0.5)
             
             # Step 2: Enhanced analysis with classifier
+            stage_start = time.time()
             enhanced_analysis = enhanced_content_analysis(text_data)
+            timings['classification'] = time.time() - stage_start
             
             # Step 3: Quick AI preview
-            yield f"data: {safe_json_dumps({'type': 'status', 'stage': 'quick_preview'})}\n\n"
+            yield {'type': 'status', 'stage': 'quick_preview'}
             
-            quick_prompt = f"""
-            {'בעברית:' if language == 'he' else 'In English:'} 
-            ספק הערכה ראשונית קצרה (2-3 משפטים) של כתובת יתדות זו:
-            
-            ז׳אנר: {enhanced_analysis['genre']}
-            תקופה: {enhanced_analysis['period']}
-            
-            התמקד בסוג הכתובת, התקופה הסבירה, והנושא העיקרי.
-            """
+            stage_start = time.time()
+            quick_prompt = create_quick_prompt(enhanced_analysis, language)
             
             quick_result = safe_ai_call("gemini-2.0-flash", quick_prompt, 
-                                      "Quick analysis unavailable. Enhanced classification available below.")
+                                      "Quick analysis unavailable. Enhanced classification available below.",
+                                      system_instruction=quick_instruction(language))
+            timings['quick_preview'] = time.time() - stage_start
             
-            yield f"data: {safe_json_dumps({'type': 'quick_preview', 'content': quick_result})}\n\n"
+            yield {'type': 'quick_preview', 'content': quick_result}
             
             # Step 4: Move to analyzing stage
-            yield f"data: {safe_json_dumps({'type': 'status', 'stage': 'analyzing'})}\n\n"
+            yield {'type': 'status', 'stage': 'analyzing'}
             time.sleep(0.5)
             
             # Step 5: Send classification data
@@ -314,76 +727,66 @@ def query_stream():
                 'language_detected': enhanced_analysis['language'],
                 'content_type': enhanced_analysis['content_type']
             }
-            yield f"data: {safe_json_dumps({'type': 'classification', **classification_data})}\n\n"
+            yield {'type': 'classification', **classification_data}
             
             # Step 6: Move to processing stage
-            yield f"data: {safe_json_dumps({'type': 'status', 'stage': 'processing'})}\n\n"
+            yield {'type': 'status', 'stage': 'processing'}
             
-            # Step 7: Deep analysis
-            deep_prompt = create_intelligent_prompt(enhanced_analysis, language)
-            detailed_analysis = safe_ai_call("gemini-2.5-pro-preview-05-06", deep_prompt,
-                                           "Detailed analysis unavailable. Classification provided.")
+            # Step 7: Deep analysis - the preview's interactive slot is swapped for a deep one,
+            # so the pro-model call waits behind interactive requests like any other deep work
+            if ticket:
+                ticket.release()
+            stage_start = time.time()
+            try:
+                ticket = admission_controller.acquire('deep')
+            except Overloaded as e:
+                ticket = None
+                logger.warning(f"Skipping deep analysis of stream: {e.reason}")
+                detailed_analysis = (f"Detailed analysis unavailable - the server is busy, please retry in {e.retry_after} seconds. "
+                                     "Classification provided.")
+            else:
+                detailed_analysis = yield from deep_analysis(text_data, enhanced_analysis, language,
+                                                             "gemini-2.5-pro-preview-05-06",
+                                                             "Detailed analysis unavailable. Classification provided.")
+            timings['deep_analysis'] = time.time() - stage_start
             
             # Step 8: Finalizing
-            yield f"data: {safe_json_dumps({'type': 'status', 'stage': 'finalizing'})}\n\n"
+            yield {'type': 'status', 'stage': 'finalizing'}
             time.sleep(0.3)
             
-            classification_summary = create_classification_summary(enhanced_analysis, language)
-            
-            final_results = {
-                'summary': quick_result,
-                'language': language,
-                'preprocessing': {
-                    'status': 'success',
-                    'preview': quick_result,
-                    'language': language,
-                    'classifier_used': True
-                },
-                'tabs': [
-                    {
-                        'name': 'Detailed Analysis' if language == 'en' else 'ניתוח מפורט',
-                        'content': detailed_analysis
-                    },
-                    {
-                        'name': 'Advanced Classification' if language == 'en' else 'סיווג מתקדם',
-                        'content': classification_summary
-                    },
-                    {
-                        'name': 'Cuneiform Words' if language == 'en' else 'מילים בכתב יתדות',
-                        'content': f"{'Identified cuneiform terms:' if language == 'en' else 'מונחים בכתב יתדות שזוהו:'}\n\n" + 
-                                 "\n".join([f"• {word}" for word in enhanced_analysis['cuneiform_words'][:20]]) if enhanced_analysis['cuneiform_words'] 
-                                 else ('No cuneiform words identified in this text.' if language == 'en' else 'לא זוהו מילים בכתב יתדות בטקסט זה.')
-                    },
-                    {
-                        'name': 'Technical Details' if language == 'en' else 'פרטים טכניים',
-                        'content': f"AI Status: {'Available' if app_state.is_gemini_available() else 'Limited'}\n"
-                                 f"Classifier: {'Available' if app_state.get_status()['classifier_available'] else 'Limited'}\n"
-                                 f"Processed: {len(text_data)} characters\n"
-                                 f"Language: {language}\n"
-                                 f"Models: {', '.join(app_state.gemini_models.keys())}\n"
-                                 f"XML Content: {'Yes' if enhanced_analysis['xml_content'] else 'No'}"
-                    }
-                ]
-            }
+            final_results = build_final_results(enhanced_analysis, quick_result, detailed_analysis, text_data, language)
+            timings['total'] = time.time() - start
+            record_analysis('/api/query-stream', text_data, language, enhanced_analysis,
+                            {'gemini-2.0-flash': quick_result, 'gemini-2.5-pro-preview-05-06': detailed_analysis}, timings)
             
-            yield f"data: {safe_json_dumps({'type': 'final_results', 'results': final_results})}\n\n"
-            yield f"data: {safe_json_dumps({'type': 'complete'})}\n\n"
+            yield {'type': 'final_results', 'results': final_results}
+            if profiler:
+                yield {'type': 'profile', 'profile': finish_profile(profiler, timings)}
+            yield {'type': 'complete'}
             
         except Exception as e:
             logger.error(f"Stream generation error: {e}")
             error_msg = f"Analysis error: {str(e)}"
-            yield f"data: {safe_json_dumps({'type': 'error', 'message': error_msg})}\n\n"
+            yield {'type': 'error', 'message': error_msg}
+        finally:
+            if profiler:
+                profiler.stop()
+            if ticket:
+                ticket.release()
     
-    return Response(generate(), 
-                   content_type='text/plain; charset=utf-8',
-                   headers={
-                       'Cache-Control': 'no-cache',
-                       'Connection': 'keep-alive',
-                       'Access-Control-Allow-Origin': '*'
-                   })
+    return stream_response(stream_registry.start(generate()))
+
+@app.route('/api/query-stream/<stream_id>', methods=['GET'])
+def resume_stream(stream_id):
+    stream = stream_registry.get(stream_id)
+    if stream is None:
+        return worker_state_not_found('Stream not found or expired')
+    _, last_seq = parse_last_event_id(request.headers.get('Last-Event-ID'))
+    return stream_response(stream, last_seq)
 
 @app.route('/api/query', methods=['POST'])
 def query():
+    profiler = None
     try:
         data = request.get_json()
         if not data:
@@ -395,14 +798,26 @@ def query():
         if not text_data:
             return jsonify({'error': 'No text data provided'}), 400
         
+        profile, error_response = profiling_requested()
+        if error_response:
+            return error_response
+        profiler = RequestProfiler().start() if profile else None
+        
+        timings = {}
+        start = time.time()
         enhanced_analysis = enhanced_content_analysis(text_data)
-        analysis_prompt = create_intelligent_prompt(enhanced_analysis, language)
-        analysis = safe_ai_call("gemini-2.0-flash", analysis_prompt, 
-                              f"Classification: {enhanced_analysis['genre']} from {enhanced_analysis['period']}")
+        timings['classification'] = time.time() - start
+        
+        stage_start = time.time()
+        analysis = run_to_completion(deep_analysis(text_data, enhanced_analysis, language, "gemini-2.0-flash",
+                                                   f"Classification: {enhanced_analysis['genre']} from {enhanced_analysis['period']}"))
+        timings['analysis'] = time.time() - stage_start
+        timings['total'] = time.time() - start
+        record_analysis('/api/query', text_data, language, enhanced_analysis, {'gemini-2.0-flash': analysis}, timings)
         
         classification_summary = create_classification_summary(enhanced_analysis, language)
         
-        return jsonify({
+        response = {
             'summary': analysis,
             'language': language,
             'classification': {
@@ -416,11 +831,273 @@ def query():
                 {'name': 'Cuneiform Words', 'content': "\n".join([f"• {word}" for word in enhanced_analysis['cuneiform_words'][:10]]) if enhanced_analysis['cuneiform_words'] else 'No words identified'},
                 {'name': 'Status', 'content': f"AI: {'Available' if app_state.is_gemini_available() else 'Limited'}\nClassifier: {'Available' if CLASSIFIER_AVAILABLE else 'Limited'}\nProcessed: {len(text_data)} characters"}
             ]
-        })
+        }
+        if profiler:
+            response['profile'] = finish_profile(profiler, timings)
+        return jsonify(response)
         
     except Exception as e:
         logger.error(f"Query endpoint error: {e}")
         return jsonify({'error': str(e)}), 500
+    finally:
+        if profiler:
+            profiler.stop()
+
+def analyze_session(session, start):
+    """
+    Re-derive the session's analysis; the model is only called when the classification changed
+    """
+    enhanced_analysis = session.analysis.analyze()
+    signature = classification_signature(enhanced_analysis)
+    model_called = signature != session.signature
+    if model_called:
+        session.model_output = run_to_completion(deep_analysis(
+            session.analysis.text, enhanced_analysis, session.language, "gemini-2.0-flash",
+            f"Classification: {enhanced_analysis['genre']} from {enhanced_analysis['period']}"))
+        session.signature = signature
+    
+    return {
+        'session_id': session.session_id,
+        'version': session.version,
+        'line_count': len(session.analysis.lines),
+        'summary': session.model_output,
+        'language': session.language,
+        'classification': {
+            'genre': enhanced_analysis['genre'],
+            'period': enhanced_analysis['period'],
+            'language_detected': enhanced_analysis['language'],
+            'content_type': enhanced_analysis['content_type']
+        },
+        'economic_terms': enhanced_analysis['economic_terms'],
+        'cuneiform_words_count': len(enhanced_analysis['cuneiform_words']),
+        'model_called': model_called,
+        'elapsed_ms': round((time.time() - start) * 1000, 2)
+    }
+
+@app.route('/api/sessions', methods=['POST'])
+def create_session():
+    if not SESSIONS_AVAILABLE:
+        return jsonify({'error': 'Incremental analysis unavailable'}), 503
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        input_data = data.get('inputData', {})
+        language = data.get('language', 'he')
+        text_data = input_data.get('data', '')
+        if not text_data:
+            return jsonify({'error': 'No text data provided'}), 400
+        
+        start = time.time()
+        session = session_store.create(IncrementalAnalysis(text_data), language)
+        with session.lock:
+            return jsonify(analyze_session(session, start)), 201
+        
+    except Exception as e:
+        logger.error(f"Session creation error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sessions/<session_id>/edits', methods=['POST'])
+def edit_session(session_id):
+    session = session_store.get(session_id)
+    if session is None:
+        return worker_state_not_found('Session not found or expired')
+    data = request.get_json(silent=True) or {}
+    edits = data.get('edits')
+    if not isinstance(edits, list):
+        return jsonify({'error': 'Expected a list of edits'}), 400
+    
+    start = time.time()
+    with session.lock:
+        if data.get('version') != session.version:
+            return jsonify({'error': 'Version mismatch', 'version': session.version}), 409
+        try:
+            session.analysis.apply_edits(edits)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'version': session.version}), 400
+        session.version += 1
+        return jsonify(analyze_session(session, start))
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    if not session_store.delete(session_id):
+        return worker_state_not_found('Session not found or expired')
+    return jsonify({'status': 'deleted'})
+
+def _run_job(payload):
+    return run_full_analysis(payload['text_data'], payload['language'])
+
+job_manager = create_job_manager(_run_job)
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        input_data = data.get('inputData', {})
+        language = data.get('language', 'he')
+        text_data = input_data.get('data', '')
+        if not text_data:
+            return jsonify({'error': 'No text data provided'}), 400
+    except Exception as e:
+        logger.error(f"Request parsing error: {e}")
+        return jsonify({'error': 'Invalid request format'}), 400
+    
+    try:
+        job_id = job_manager.submit({'text_data': text_data, 'language': language})
+    except JobQueueFull as e:
+        logger.warning(f"Shedding {request.path}: {e}")
+        return overloaded_response(e.retry_after)
+    logger.info(f"Queued analysis job {job_id}")
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    # ?wait=<seconds> turns the poll into a long-poll that returns once the job finishes
+    wait = min(request.args.get('wait', 0, type=float), 30)
+    job = job_manager.wait(job_id, wait) if wait > 0 else job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    if job_manager.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        # The current status goes out right away - then each change as it happens
+        job = job_manager.get(job_id)
+        last_status = None
+        while True:
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield f"data: {safe_json_dumps({'type': 'status', 'stage': job['status']})}\n\n"
+            else:
+                # The wait timed out with nothing new - a comment keeps idle proxies from dropping the connection
+                yield ": keep-alive\n\n"
+            if job['status'] == 'done':
+                yield f"data: {safe_json_dumps({'type': 'final_results', 'results': job['result']})}\n\n"
+                yield f"data: {safe_json_dumps({'type': 'complete'})}\n\n"
+                return
+            if job['status'] == 'failed':
+                yield f"data: {safe_json_dumps({'type': 'error', 'message': job['error']})}\n\n"
+                return
+            job = job_manager.wait(job_id, 15, known_status=last_status)
+    
+    return Response(generate(), 
+                   content_type='text/plain; charset=utf-8',
+                   headers={
+                       'Cache-Control': 'no-cache',
+                       'Connection': 'keep-alive',
+                       'Access-Control-Allow-Origin': '*'
+                   })
+
+def read_request_chunks(chunk_size=65536):
+    while True:
+        chunk = request.stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+@app.route('/api/corpus', methods=['POST'])
+def analyze_corpus_file():
+    """
+    Corpus mode: the body is either JSON {'inputData': {'data': ...}} or the raw XML itself.
+    Documents are split off while the body is still being read and each result is sent as soon
+    as it is ready - SSE by default, one JSON object per line with ?format=ndjson
+    """
+    if not CORPUS_AVAILABLE:
+        return jsonify({'error': 'Corpus analysis unavailable'}), 503
+    
+    if request.is_json:
+        data = request.get_json()
+        text_data = data.get('inputData', {}).get('data', '') if data else ''
+        if not text_data:
+            return jsonify({'error': 'No data provided'}), 400
+        chunks = [text_data]
+    else:
+        chunks = read_request_chunks()
+    
+    ndjson = request.args.get('format') == 'ndjson'
+    
+    def format_event(payload):
+        if ndjson:
+            return safe_json_dumps(payload) + "\n"
+        return f"data: {safe_json_dumps(payload)}\n\n"
+    
+    def generate():
+        start = time.time()
+        count = 0
+        try:
+            for result in analyze_corpus(chunks):
+                count += 1
+                yield format_event({'type': 'document', **result})
+        except Exception as e:
+            logger.error(f"Corpus analysis error: {e}")
+            yield format_event({'type': 'error', 'message': str(e)})
+            return
+        yield format_event({'type': 'complete', 'documents': count, 'elapsed': round(time.time() - start, 3)})
+    
+    return Response(stream_with_context(generate()),
+                   content_type='application/x-ndjson; charset=utf-8' if ndjson else 'text/plain; charset=utf-8',
+                   headers={
+                       'Cache-Control': 'no-cache',
+                       'Connection': 'keep-alive',
+                       'Access-Control-Allow-Origin': '*'
+                   })
+
+@app.route('/api/analyses', methods=['GET'])
+def list_analyses():
+    try:
+        filters = {name: request.args[name] for name in ('genre', 'period', 'language') if request.args.get(name)}
+        items, next_cursor = analysis_history.query(
+            filters=filters,
+            since=request.args.get('since', type=float),
+            until=request.args.get('until', type=float),
+            limit=request.args.get('limit', 50, type=int),
+            cursor=request.args.get('cursor')
+        )
+        return jsonify({'items': items, 'count': len(items), 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"History query error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    admin_token = os.environ.get('PROFILE_ADMIN_TOKEN')
+    if not admin_token or not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({'error': 'Admin token required'}), 403
+    path = profile_path(PROFILE_DIR, profile_id)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    with open(path, encoding='utf-8') as f:
+        return Response(f.read(), content_type='text/plain; charset=utf-8',
+                        headers={'Content-Disposition': f'attachment; filename={profile_id}.folded'})
+
+@app.route('/api/admission', methods=['GET'])
+def admission_stats():
+    stats = admission_controller.stats()
+    stats['jobs'] = job_manager.stats()
+    return jsonify(stats)
+
+@app.route('/api/memory', methods=['GET'])
+def memory():
+    # Under api/serve.py: per-worker RSS next to the pages shared with the other workers
+    report = memory_report()
+    report['model_weight_bytes'] = model_weight_bytes()
+    return jsonify(report)
+
+@app.route('/api/transport', methods=['GET'])
+def transport_stats():
+    stats = GEMINI_CLIENT.transport_stats()
+    if GEMINI_CLIENT is StubGemini:
+        # Offline backend: what each model would have sent, to compare prompt sizes without the API
+        stats['payloads'] = {name: model.payload_stats() for name, model in list(app_state.gemini_models.items())}
+    return jsonify(stats)
 
 @app.route('/api/health', methods=['GET'])
 def health():
@@ -435,12 +1112,24 @@ def health():
         'timestamp': time.time()
     })
 
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    # Readiness, unlike /api/health (liveness), fails until the warm-up has loaded every model
+    status = app_state.get_status()
+    return jsonify({
+        'ready': status['ready'],
+        'warmup_done': status['warmup_done'],
+        'warmup_models': status['warmup_models'],
+        'loaded_models': status['loaded_models'],
+        'last_error': status['last_error'],
+        'timestamp': time.time()
+    }), 200 if status['ready'] else 503
+
 @app.route('/api/test-models', methods=['GET'])
 def test_models():
     results = {}
-    models_to_test = ["gemini-2.0-flash", "gemini-2.5-pro-preview-05-06"]
     
-    for model_name in models_to_test:
+    for model_name in DEFAULT_MODELS:
         try:
             model = app_state.get_gemini_model(model_name)
             test_result = model.ask("Say 'Hello from " + model_name + "'", short_answer=True)
@@ -501,6 +1190,29 @@ def test_classifier():
             'classifier_available': CLASSIFIER_AVAILABLE
         }), 500
 
+@app.route('/api/classify-batch', methods=['POST'])
+def classify_batch():
+    if batch_classifier is None:
+        return jsonify({'error': 'Batch classifier unavailable'}), 503
+    try:
+        data = request.get_json()
+        texts = data.get('texts') if data else None
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            return jsonify({'error': 'Expected a list of texts'}), 400
+        
+        start = time.time()
+        results = batch_classifier.classify_batch(texts)
+        return jsonify({
+            'status': 'success',
+            'count': len(results),
+            'results': results,
+            'elapsed_ms': round((time.time() - start) * 1000, 2)
+        })
+        
+    except Exception as e:
+        logger.error(f"Batch classification error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
     logger.info("🚀 Starting Epigraph-AI server...")
     logger.info(f"🤖 AI Status: Initializing...")
@@ -0,0 +1,53 @@
+"""
+Multi-process entry point: python api/serve.py
+
+The classifier models are loaded once in the parent process and shared by every worker
+(WEB_WORKERS, default: CPU count). Single-process development still uses python api/index.py.
+
+Background jobs work across workers - they live in the shared SQLite store, so any worker can
+report on them. Incremental sessions (/api/sessions) and stream resumption (/api/query-stream/<id>)
+are kept in the memory of the worker that created them, and a follow-up request that reaches
+another worker gets a 404. Use WEB_WORKERS=1 where clients rely on them.
+"""
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(current_dir), 'src', 'server'))
+sys.path.insert(0, current_dir)
+
+from prefork import serve_from_environment # type: ignore
+from jobs import create_job_store # type: ignore
+
+
+def preload():
+    # Jobs left over from the previous server are failed here once, before any worker takes jobs
+    store = create_job_store()
+    store.fail_unfinished()
+    store.close()
+    try:
+        from Classifier.classifier import preload_models
+        loaded = preload_models()
+    except ImportError as e:
+        print(f"⚠️ Classifier models not preloaded: {e}")
+        return
+    print(f"📚 Preloaded {len(loaded)} classifier models")
+
+
+def worker_exited(pid):
+    # The jobs that worker had queued or running died with it
+    store = create_job_store()
+    store.fail_unfinished(worker_pid=pid)
+    store.close()
+
+
+def load_app():
+    from index import app
+    return app
+
+
+if __name__ == '__main__':
+    # Every worker starts its own corpus process pool - split the CPUs between them
+    web_workers = int(os.environ.get("WEB_WORKERS", os.cpu_count() or 1))
+    os.environ.setdefault("CORPUS_WORKERS", str(max(1, (os.cpu_count() or 1) // web_workers)))
+    serve_from_environment(load_app, preload=preload, on_worker_exit=worker_exited)
@@ -0,0 +1,210 @@
+import bisect
+import itertools
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# Priority classes, highest first - a waiting request is always admitted before
+# any waiting request of a later class
+PRIORITY_CLASSES = ("cheap", "interactive", "deep")
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of queued"""
+
+    def __init__(self, priority, retry_after, reason):
+        super().__init__(f"{priority} request rejected: {reason}")
+        self.priority = priority
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionTicket:
+    """
+    A granted slot - must be released exactly once when the work is done
+    Releasing again is a no-op, so a ticket can be handed from a request to a background thread
+    """
+
+    def __init__(self, controller, priority):
+        self.controller = controller
+        self.priority = priority
+        self.granted_at = None
+        self._granted = threading.Event()
+        self._released = False
+
+    def release(self):
+        self.controller._release(self)
+
+
+class AdmissionController:
+    """
+    Bounded, priority-ordered admission in front of the request handlers
+
+    At most max_concurrent requests run at once. `reserved` of those slots can only be used by
+    the cheap class, so cheap requests keep their latency even when deep analyses fill every
+    other slot. A request that would have to wait longer than wait_target - by the estimate
+    from recent service times, or in fact - is rejected so the client can retry later.
+    """
+
+    def __init__(self, max_concurrent=8, reserved=2, queue_limit=64, wait_target=10.0, smoothing=0.2):
+        """
+        Args:
+            max_concurrent (int): Requests running at once across all classes
+            reserved (int): Slots only the cheap class may use
+            queue_limit (int): Maximum waiting requests per class
+            wait_target (float): Longest queue wait in seconds before a request is shed
+            smoothing (float): Weight of the newest sample in the service time average
+        """
+        if not 0 <= reserved < max_concurrent:
+            raise ValueError("reserved must be smaller than max_concurrent")
+        self.max_concurrent = max_concurrent
+        self.reserved = reserved
+        self.queue_limit = queue_limit
+        self.wait_target = wait_target
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._waiting = []  # sorted (rank, seq, ticket)
+        self._seq = itertools.count()
+        self._active = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._service_time = {priority: None for priority in PRIORITY_CLASSES}
+        self._admitted = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._rejected = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._waits = {priority: deque(maxlen=512) for priority in PRIORITY_CLASSES}
+
+    def acquire(self, priority):
+        """
+        Wait for a slot in the given class
+
+        Args:
+            priority (str): One of PRIORITY_CLASSES
+
+        Returns:
+            AdmissionTicket: The granted slot
+
+        Raises:
+            ValueError: If the priority class is unknown
+            Overloaded: If the request is shed - retry_after says when to come back
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class '{priority}'. Available: {list(PRIORITY_CLASSES)}")
+        ticket = AdmissionTicket(self, priority)
+        entry = (PRIORITY_CLASSES.index(priority), next(self._seq), ticket)
+        arrived = time.monotonic()
+
+        with self._lock:
+            queued = sum(1 for _, _, waiting in self._waiting if waiting.priority == priority)
+            if queued >= self.queue_limit:
+                self._rejected[priority] += 1
+                raise Overloaded(priority, self._retry_after(self._estimate_wait(entry)), "queue full")
+            estimate = self._estimate_wait(entry)
+            if estimate > self.wait_target:
+                self._rejected[priority] += 1
+                raise Overloaded(priority, self._retry_after(estimate), "estimated wait exceeds target")
+            bisect.insort(self._waiting, entry)
+            self._dispatch()
+
+        if not ticket._granted.wait(self.wait_target):
+            with self._lock:
+                # The grant may have raced with the timeout
+                if not ticket._granted.is_set():
+                    self._waiting.remove(entry)
+                    self._rejected[priority] += 1
+                    raise Overloaded(priority, self._retry_after(self.wait_target), "queue wait exceeded target")
+
+        self._waits[priority].append(ticket.granted_at - arrived)
+        return ticket
+
+    def stats(self):
+        """
+        Returns:
+            dict: Per class queue depth, running count, admitted/rejected totals and recent wait times
+        """
+        with self._lock:
+            classes = {}
+            for priority in PRIORITY_CLASSES:
+                waits = sorted(self._waits[priority])
+                service_time = self._service_time[priority]
+                classes[priority] = {
+                    'queued': sum(1 for _, _, ticket in self._waiting if ticket.priority == priority),
+                    'running': self._active[priority],
+                    'admitted': self._admitted[priority],
+                    'rejected': self._rejected[priority],
+                    'wait_ms_avg': round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                    'wait_ms_p95': round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+                    'wait_ms_max': round(1000 * waits[-1], 2) if waits else 0.0,
+                    'service_ms_avg': round(1000 * service_time, 2) if service_time is not None else None,
+                }
+            return {
+                'max_concurrent': self.max_concurrent,
+                'reserved_for_cheap': self.reserved,
+                'running': sum(self._active.values()),
+                'queued': len(self._waiting),
+                'wait_target_seconds': self.wait_target,
+                'classes': classes,
+            }
+
+    def _fits(self, priority):
+        running = sum(self._active.values())
+        if priority == "cheap":
+            return running < self.max_concurrent
+        shared = running - self._active["cheap"]
+        return running < self.max_concurrent and shared < self.max_concurrent - self.reserved
+
+    def _dispatch(self):
+        # Called with the lock held - grants waiting tickets in priority order while slots are free
+        for entry in list(self._waiting):
+            ticket = entry[2]
+            if self._fits(ticket.priority):
+                self._waiting.remove(entry)
+                self._active[ticket.priority] += 1
+                self._admitted[ticket.priority] += 1
+                ticket.granted_at = time.monotonic()
+                ticket._granted.set()
+
+    def _release(self, ticket):
+        with self._lock:
+            if ticket._released or not ticket._granted.is_set():
+                return
+            ticket._released = True
+            self._active[ticket.priority] -= 1
+            elapsed = time.monotonic() - ticket.granted_at
+            previous = self._service_time[ticket.priority]
+            self._service_time[ticket.priority] = (
+                elapsed if previous is None else previous + self.smoothing * (elapsed - previous)
+            )
+            self._dispatch()
+
+    def _estimate_wait(self, entry):
+        """
+        Rough queue wait for a new entry: the service time of everything queued ahead of it
+        plus one running request, spread over the slots its class may use
+        """
+        rank, priority = entry[0], entry[2].priority
+        if self._fits(priority) and not any(waiting[0] <= rank for waiting in self._waiting):
+            return 0.0
+        ahead = [ticket.priority for waiting_rank, _, ticket in self._waiting if waiting_rank <= rank]
+        running = [p for p in PRIORITY_CLASSES for _ in range(self._active[p])]
+        if any(self._service_time[p] is None for p in ahead + running):
+            # No measurements yet - rely on the queue limit and the wait timeout
+            return 0.0
+        work = sum(self._service_time[p] for p in ahead)
+        if running:
+            work += sum(self._service_time[p] for p in running) / len(running)
+        slots = self.max_concurrent if priority == "cheap" else self.max_concurrent - self.reserved
+        return work / slots
+
+    @staticmethod
+    def _retry_after(seconds):
+        return max(1, math.ceil(seconds))
+
+
+def create_admission_controller():
+    """Build an AdmissionController configured from the environment"""
+    return AdmissionController(
+        max_concurrent=int(os.environ.get("ADMISSION_MAX_CONCURRENT", 8)),
+        reserved=int(os.environ.get("ADMISSION_RESERVED_CHEAP", 2)),
+        queue_limit=int(os.environ.get("ADMISSION_QUEUE_LIMIT", 64)),
+        wait_target=float(os.environ.get("ADMISSION_WAIT_TARGET", 10)),
+    )
@@ -1,7 +1,14 @@
 import google.generativeai as genai
 from google.oauth2 import service_account
+import base64
+import datetime
 import json
 import os
+import threading
+import time
+from contextlib import nullcontext
+
+from transport import create_transport
 
 
 class Gemini:
@@ -12,7 +19,22 @@ class Gemini:
 
     # Environment variable holding the JSON service account
     _ENV_VAR = "GOOGLE_SERVICE_ACCOUNT_JSON"
+    # Alternative: the same JSON, base64-encoded
+    _B64_ENV_VAR = "GOOGLE_CREDENTIALS_B64"
+
+    # Set to "1" to upload system instructions through the API's context cache
+    _CONTEXT_CACHE_ENV_VAR = "GEMINI_CONTEXT_CACHE"
+    # Lifetime of a cached system instruction before it is uploaded again
+    _CONTEXT_CACHE_TTL = datetime.timedelta(hours=1)
+    # The API rejects cached content under 1024 tokens - instructions shorter than that
+    # (estimated at ~4 characters per token) go straight to the model client
+    _CONTEXT_CACHE_MIN_CHARS = 4096
 
+    # Credentials are parsed and genai.configure() is called once per process
+    _credentials_lock = threading.Lock()
+    _credentials_configured = False
+    # Shared connection pool for every client (None with GEMINI_TRANSPORT=sdk)
+    _transport = None
 
     # Available models with descriptions
     AVAILABLE_MODELS = {
@@ -29,6 +51,15 @@ class Gemini:
         self.chat = None
         self.model_name = None
         self._initialized = False
+        # System instruction -> (model bound to it, expiry time or None)
+        self._instruction_models = {}
+        # Guards the dict only - creating a model (a network call with the context cache)
+        # happens under a lock per instruction, so other instructions are never held up
+        self._instruction_lock = threading.Lock()
+        self._creation_locks = {}
+        # Channel of the shared transport this client is pinned to
+        self._channel_index = None
+        self._client = None
 
     def init_model(self, model_name):
         """
@@ -54,21 +85,13 @@ class Gemini:
 
             print(f"🚀 Initializing model: {model_name}...")
 
-            # Load credentials from environment variable
-            creds_json = os.environ.get(self._ENV_VAR)
-            if not creds_json:
-                raise ValueError(f"Environment variable '{self._ENV_VAR}' not found.")
+            self.configure_credentials()
 
-            try:
-                service_account_info = json.loads(creds_json)
-                credentials = service_account.Credentials.from_service_account_info(service_account_info)
-            except Exception as e:
-                raise Exception(f"Invalid credentials JSON in '{self._ENV_VAR}': {e}")
-
-            genai.configure(credentials=credentials)
+            if self._transport is not None:
+                self._channel_index, self._client = self._transport.client()
 
             # Instantiate the model and chat
-            self.model = genai.GenerativeModel(model_name)
+            self.model = self._pin(genai.GenerativeModel(model_name))
             self.chat = self.model.start_chat()
             self.model_name = model_name
             self._initialized = True
@@ -79,13 +102,60 @@ class Gemini:
         except Exception as e:
             raise Exception(f"Failed to initialize Gemini: {e}")
 
-    def ask(self, question, short_answer=True):
+    @classmethod
+    def configure_credentials(cls):
+        """
+        Parse the service account from the environment and configure genai.
+        Safe to call from many threads - only the first call does any work.
+
+        Raises:
+            Exception: If the credentials are missing or invalid
+        """
+        if cls._credentials_configured:
+            return
+
+        with cls._credentials_lock:
+            if cls._credentials_configured:
+                return
+
+            creds_json = os.environ.get(cls._ENV_VAR)
+            source = cls._ENV_VAR
+            if not creds_json and os.environ.get(cls._B64_ENV_VAR):
+                creds_json = base64.b64decode(os.environ[cls._B64_ENV_VAR]).decode("utf-8")
+                source = cls._B64_ENV_VAR
+            if not creds_json:
+                raise ValueError(f"Environment variable '{cls._ENV_VAR}' not found.")
+
+            try:
+                service_account_info = json.loads(creds_json)
+                credentials = service_account.Credentials.from_service_account_info(service_account_info)
+            except Exception as e:
+                raise Exception(f"Invalid credentials JSON in '{source}': {e}")
+
+            genai.configure(credentials=credentials)
+            Gemini._transport = create_transport(credentials)
+            cls._credentials_configured = True
+
+    @classmethod
+    def transport_stats(cls):
+        """
+        Returns:
+            dict: Connection reuse and per-channel call counts of the shared transport
+        """
+        if cls._transport is None:
+            return {"transport": "sdk"}
+        return cls._transport.stats()
+
+    def ask(self, question, short_answer=True, system_instruction=None):
         """
         Ask Gemini a question and get a response
         
         Args:
             question (str): The question to ask
             short_answer (bool): Whether to request a concise answer
+            system_instruction (str, optional): Fixed instructions for this kind of question.
+                They are set once on a model bound to them, so only the question is sent per call,
+                and the call does not go through (or grow) the chat history.
             
         Returns:
             str: Gemini's response
@@ -107,12 +177,88 @@ class Gemini:
                 prompt = question
 
             # Get response
-            response = self.chat.send_message(prompt)
-            return response.text
+            if system_instruction is None:
+                return self._send(prompt)
+            return self._generate(self.prepare_system_instruction(system_instruction), prompt)
 
         except Exception as e:
             raise Exception(f"Error getting response: {e}")
 
+    def prepare_system_instruction(self, system_instruction):
+        """
+        Get the model bound to a system instruction, creating it on first use
+
+        With GEMINI_CONTEXT_CACHE=1 the instruction is uploaded once to the API's context cache
+        and reused until it expires; if the model or the instruction size does not qualify for
+        caching, the instruction is set on the model client instead.
+
+        Args:
+            system_instruction (str): Fixed instructions
+
+        Returns:
+            object: Model to pass to _generate()
+        """
+        if not self._initialized:
+            raise Exception("Model not initialized. Call init_model() first!")
+
+        with self._instruction_lock:
+            model = self._live_instruction_model(system_instruction)
+            if model is not None:
+                return model
+            creation_lock = self._creation_locks.setdefault(system_instruction, threading.Lock())
+
+        with creation_lock:
+            # Another thread may have created it while this one waited
+            with self._instruction_lock:
+                model = self._live_instruction_model(system_instruction)
+            if model is None:
+                model, expires_at = self._create_instruction_model(system_instruction)
+                with self._instruction_lock:
+                    self._instruction_models[system_instruction] = (model, expires_at)
+            return model
+
+    def _live_instruction_model(self, system_instruction):
+        # Called with _instruction_lock held
+        model, expires_at = self._instruction_models.get(system_instruction, (None, None))
+        if model is None or (expires_at is not None and time.time() >= expires_at):
+            return None
+        return model
+
+    def _create_instruction_model(self, system_instruction):
+        if (os.environ.get(self._CONTEXT_CACHE_ENV_VAR) == "1"
+                and len(system_instruction) >= self._CONTEXT_CACHE_MIN_CHARS):
+            try:
+                cached = genai.caching.CachedContent.create(
+                    model=self.model_name,
+                    system_instruction=system_instruction,
+                    ttl=self._CONTEXT_CACHE_TTL
+                )
+                # Renew a minute early so a call never races the expiry
+                expires_at = time.time() + self._CONTEXT_CACHE_TTL.total_seconds() - 60
+                return self._pin(genai.GenerativeModel.from_cached_content(cached)), expires_at
+            except Exception as e:
+                print(f"⚠️ Context cache unavailable for {self.model_name}, using a system instruction: {e}")
+        return self._pin(genai.GenerativeModel(self.model_name, system_instruction=system_instruction)), None
+
+    def _pin(self, model):
+        # GenerativeModel only creates its own client when this attribute is unset
+        if self._client is not None:
+            model._client = self._client
+        return model
+
+    def _call(self):
+        if self._transport is None:
+            return nullcontext({})
+        return self._transport.call(self._channel_index)
+
+    def _send(self, prompt):
+        with self._call() as request_options:
+            return self.chat.send_message(prompt, request_options=request_options).text
+
+    def _generate(self, model, prompt):
+        with self._call() as request_options:
+            return model.generate_content(prompt, request_options=request_options).text
+
     def get_model_name(self):
         """Get the current model name"""
         return self.model_name if self._initialized else None
@@ -157,6 +303,65 @@ class Gemini:
                 exit(0)
 
 
+class StubGemini(Gemini):
+    """
+    Offline stand-in for Gemini (GEMINI_BACKEND=stub) - no credentials or network
+    Records what each call would have sent, so prompt sizes can be checked without the API
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self.instruction_setups = []
+        self._requests_lock = threading.Lock()
+
+    def init_model(self, model_name):
+        if model_name not in self.AVAILABLE_MODELS:
+            raise ValueError(f"Invalid model. Available: {list(self.AVAILABLE_MODELS.keys())}")
+        self.model_name = model_name
+        self._initialized = True
+        return self
+
+    @classmethod
+    def transport_stats(cls):
+        return {"transport": "stub"}
+
+    def payload_stats(self):
+        """
+        Returns:
+            dict: Number of calls, characters sent per call, and how often instructions were set
+        """
+        with self._requests_lock:
+            sizes = [request["payload_chars"] for request in self.requests]
+            return {
+                "model": self.model_name,
+                "calls": len(sizes),
+                "payload_chars_total": sum(sizes),
+                "payload_chars_avg": round(sum(sizes) / len(sizes), 1) if sizes else 0.0,
+                "instruction_setups": len(self.instruction_setups),
+                "instruction_chars": sum(len(instruction) for instruction in self.instruction_setups),
+            }
+
+    def _create_instruction_model(self, system_instruction):
+        with self._requests_lock:
+            self.instruction_setups.append(system_instruction)
+        return system_instruction, None
+
+    def _send(self, prompt):
+        return self._record(prompt, None)
+
+    def _generate(self, model, prompt):
+        return self._record(prompt, model)
+
+    def _record(self, prompt, system_instruction):
+        with self._requests_lock:
+            self.requests.append({
+                "payload_chars": len(prompt),
+                "system_instruction": system_instruction is not None,
+            })
+        return f"[stub {self.model_name}] {len(prompt)} characters received"
+
+
 def init_model(model_name=None):
     """
     Convenience function to create and initialize a Gemini instance
@@ -0,0 +1,173 @@
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AnalysisHistory:
+    """
+    SQLite-backed history of every completed analysis
+    Writes go through a single background thread so responses never wait on disk
+    """
+
+    _SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS analyses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at REAL NOT NULL,
+            endpoint TEXT NOT NULL,
+            input_hash TEXT NOT NULL,
+            input_length INTEGER NOT NULL,
+            genre TEXT,
+            period TEXT,
+            language TEXT,
+            content_type TEXT,
+            response_language TEXT,
+            cuneiform_words TEXT,
+            economic_terms TEXT,
+            model_outputs TEXT,
+            timings TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_analyses_time ON analyses (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_analyses_genre ON analyses (genre, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_analyses_period ON analyses (period, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_analyses_language ON analyses (language, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_analyses_input_hash ON analyses (input_hash)",
+    ]
+
+    # Columns that can be filtered on - each one has its own (column, created_at, id) index
+    FILTERS = ("genre", "period", "language")
+
+    MAX_PAGE_SIZE = 200
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self._SCHEMA:
+                self._conn.execute(statement)
+            self._conn.commit()
+
+    def record(self, endpoint, text_data, response_language, enhanced_analysis, model_outputs, timings):
+        """
+        Queue one analysis for storage
+
+        Args:
+            endpoint (str): Route that produced the analysis
+            text_data (str): Raw input - only its hash and length are kept
+            response_language (str): Language the answer was written in ('he'/'en')
+            enhanced_analysis (dict): Output of enhanced_content_analysis
+            model_outputs (dict): Model name -> generated text
+            timings (dict): Stage name -> seconds
+        """
+        row = (
+            time.time(),
+            endpoint,
+            hashlib.sha256(text_data.encode("utf-8")).hexdigest(),
+            len(text_data),
+            enhanced_analysis.get("genre"),
+            enhanced_analysis.get("period"),
+            enhanced_analysis.get("language"),
+            enhanced_analysis.get("content_type"),
+            response_language,
+            json.dumps(enhanced_analysis.get("cuneiform_words", []), ensure_ascii=False),
+            json.dumps(enhanced_analysis.get("economic_terms", []), ensure_ascii=False),
+            json.dumps(model_outputs, ensure_ascii=False),
+            json.dumps(timings),
+        )
+        self._writer.submit(self._insert, row)
+
+    def _insert(self, row):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO analyses (created_at, endpoint, input_hash, input_length, genre, period, "
+                "language, content_type, response_language, cuneiform_words, economic_terms, "
+                "model_outputs, timings) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row
+            )
+            self._conn.commit()
+
+    def query(self, filters=None, since=None, until=None, limit=50, cursor=None):
+        """
+        Newest-first page of analyses using keyset pagination on (created_at, id)
+
+        Args:
+            filters (dict, optional): Exact matches on genre/period/language
+            since (float, optional): Only analyses at or after this Unix time
+            until (float, optional): Only analyses before this Unix time
+            limit (int): Page size, capped at MAX_PAGE_SIZE
+            cursor (str, optional): next_cursor from the previous page
+
+        Returns:
+            tuple: (items, next_cursor) - next_cursor is None on the last page
+
+        Raises:
+            ValueError: If a filter or the cursor is invalid
+        """
+        clauses, params = [], []
+        for column, value in (filters or {}).items():
+            if column not in self.FILTERS:
+                raise ValueError(f"Unknown filter '{column}'. Available: {list(self.FILTERS)}")
+            clauses.append(f"{column} = ?")
+            params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if cursor:
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(self._decode_cursor(cursor))
+
+        limit = max(1, min(int(limit), self.MAX_PAGE_SIZE))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT * FROM analyses {where} ORDER BY created_at DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit + 1]).fetchall()
+
+        items = [self._decode_row(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = self._encode_cursor(last["created_at"], last["id"])
+        return items, next_cursor
+
+    def flush(self):
+        """Wait until every queued record has been written"""
+        self._writer.submit(lambda: None).result()
+
+    @staticmethod
+    def _decode_row(row):
+        item = dict(row)
+        for column in ("cuneiform_words", "economic_terms", "model_outputs", "timings"):
+            item[column] = json.loads(item[column]) if item[column] else None
+        return item
+
+    @staticmethod
+    def _encode_cursor(created_at, row_id):
+        raw = f"{created_at!r}:{row_id}".encode("ascii")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        try:
+            created_at, row_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii").split(":")
+            return float(created_at), int(row_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+
+def create_analysis_history():
+    """Build an AnalysisHistory configured from the environment"""
+    db_path = os.environ.get("HISTORY_DB_PATH", "/tmp/epigraph_history.sqlite3")
+    return AnalysisHistory(db_path)
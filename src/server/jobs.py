@@ -0,0 +1,269 @@
+import json
+import math
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from prefork import in_prefork_worker
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting for a worker"""
+
+    def __init__(self, queued, retry_after):
+        super().__init__(f"{queued} jobs already queued")
+        self.queued = queued
+        self.retry_after = retry_after
+
+
+class JobStore:
+    """
+    SQLite-backed store for analysis jobs - one row per job
+    Results are kept as JSON so any endpoint can read them back
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            language TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            result TEXT,
+            error TEXT,
+            worker_pid INTEGER
+        )
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(self._SCHEMA)
+            # Databases created before jobs recorded the process that runs them
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "worker_pid" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN worker_pid INTEGER")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def create(self, job_id, language):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, language, created_at, worker_pid) VALUES (?, ?, ?, ?, ?)",
+                (job_id, "queued", language, time.time(), os.getpid())
+            )
+            self._conn.commit()
+
+    def mark_running(self, job_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                (time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def mark_done(self, job_id, result):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, result = ? WHERE id = ?",
+                (time.time(), json.dumps(result, ensure_ascii=False), job_id)
+            )
+            self._conn.commit()
+
+    def mark_failed(self, job_id, error):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                (time.time(), error, job_id)
+            )
+            self._conn.commit()
+
+    def get(self, job_id):
+        """
+        Returns:
+            dict: The job row with the result decoded, or None if unknown
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def fail_unfinished(self, worker_pid=None):
+        """
+        Jobs left queued/running by a process that is gone will never finish
+
+        Args:
+            worker_pid (int, optional): Only fail the jobs of this process - by default every
+                unfinished job, which is only safe before any process has started taking jobs
+        """
+        query = ("UPDATE jobs SET status = 'failed', finished_at = ?, error = 'Server restarted' "
+                 "WHERE status IN ('queued', 'running')")
+        params = (time.time(),)
+        if worker_pid is not None:
+            query += " AND worker_pid = ?"
+            params += (worker_pid,)
+        with self._lock:
+            self._conn.execute(query, params)
+            self._conn.commit()
+
+
+class JobManager:
+    """
+    Runs analysis jobs on a bounded worker pool so HTTP threads return immediately
+    The backlog of jobs waiting for a worker is bounded too - past max_queued, submit() refuses
+    """
+
+    def __init__(self, store, runner, max_workers=2, max_queued=32, recover=True, poll_interval=None):
+        """
+        Args:
+            store (JobStore): Where job state and results are kept
+            runner (callable): runner(payload) -> JSON-serializable result
+            max_workers (int): Maximum number of jobs running at once
+            max_queued (int): Maximum number of jobs waiting for a worker
+            recover (bool): Fail the jobs a previous server left unfinished. Only the process that
+                owns the whole store may do this - under the prefork server the parent does it.
+            poll_interval (float, optional): Re-read the store this often while waiting, for jobs
+                run by another process. None relies on this process's notifications only.
+        """
+        self.store = store
+        self.runner = runner
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._changed = threading.Condition()
+        self.poll_interval = poll_interval
+        self._queued = 0
+        self._run_time = None
+        if recover:
+            self.store.fail_unfinished()
+
+    def submit(self, payload):
+        """
+        Queue a job for the worker pool
+
+        Returns:
+            str: The new job's id
+
+        Raises:
+            JobQueueFull: If max_queued jobs are already waiting - retry_after says when to come back
+        """
+        with self._changed:
+            if self._queued >= self.max_queued:
+                raise JobQueueFull(self._queued, self._retry_after())
+            self._queued += 1
+        job_id = uuid.uuid4().hex
+        try:
+            self.store.create(job_id, payload.get("language"))
+            self._executor.submit(self._run, job_id, payload)
+        except Exception:
+            with self._changed:
+                self._queued -= 1
+            raise
+        return job_id
+
+    def stats(self):
+        with self._changed:
+            return {
+                "workers": self.max_workers,
+                "queued": self._queued,
+                "max_queued": self.max_queued,
+                "run_seconds_avg": round(self._run_time, 3) if self._run_time is not None else None,
+            }
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def wait(self, job_id, timeout, known_status=None):
+        """
+        Block until the job leaves known_status or the timeout passes
+
+        Args:
+            job_id (str): Job to watch
+            timeout (float): Maximum seconds to block
+            known_status (str, optional): Last status the caller saw.
+                If None, waits for the job to finish.
+
+        Returns:
+            dict: The current job row, or None if unknown
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self.store.get(job_id)
+                if job is None or job["status"] in ("done", "failed"):
+                    return job
+                if known_status is not None and job["status"] != known_status:
+                    return job
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return job
+                self._changed.wait(remaining if self.poll_interval is None else min(remaining, self.poll_interval))
+
+    def _run(self, job_id, payload):
+        with self._changed:
+            self._queued -= 1
+        start = time.monotonic()
+        try:
+            self.store.mark_running(job_id)
+            self._notify()
+            result = self.runner(payload)
+            self.store.mark_done(job_id, result)
+        except Exception as e:
+            self.store.mark_failed(job_id, str(e))
+        finally:
+            with self._changed:
+                elapsed = time.monotonic() - start
+                self._run_time = elapsed if self._run_time is None else self._run_time + 0.2 * (elapsed - self._run_time)
+            self._notify()
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _retry_after(self):
+        # Called with the lock held - roughly when the backlog ahead of a new job drains
+        if self._run_time is None:
+            return 1
+        return max(1, math.ceil(self._run_time * self._queued / self.max_workers))
+
+
+def create_job_store():
+    """Open the JobStore configured from the environment (JOBS_DB_PATH)"""
+    return JobStore(os.environ.get("JOBS_DB_PATH", "/tmp/epigraph_jobs.sqlite3"))
+
+
+def create_job_manager(runner):
+    """
+    Build a JobManager configured from the environment
+
+    Under the prefork server every worker runs its own jobs on the shared store: the parent
+    fails leftover jobs once at boot, and waits poll the store to see other workers' jobs.
+    Child processes of the multiprocessing module (corpus workers) never recover either.
+
+    Args:
+        runner (callable): runner(payload) -> JSON-serializable result
+
+    Returns:
+        JobManager: Ready-to-use job manager
+    """
+    max_workers = int(os.environ.get("JOB_WORKERS", 2))
+    max_queued = int(os.environ.get("JOB_QUEUE_LIMIT", 32))
+    worker = in_prefork_worker()
+    owns_store = not worker and multiprocessing.current_process().name == "MainProcess"
+    return JobManager(create_job_store(), runner, max_workers=max_workers, max_queued=max_queued,
+                      recover=owns_store, poll_interval=0.5 if worker else None)
@@ -0,0 +1,237 @@
+import bisect
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+from werkzeug.serving import make_server
+
+# Set in every worker so the app can tell it runs under the prefork server
+PARENT_PID_ENV_VAR = "PREFORK_PARENT_PID"
+
+
+class PreforkServer:
+    """
+    Multi-process server: loads shared state once in the parent, then forks workers
+
+    Whatever preload() loads (model weights) lives in the parent before the fork, so the workers
+    share those pages copy-on-write instead of each holding a copy. The app itself is imported
+    in each worker after the fork, so its threads, pools and database connections are per worker.
+
+    Workers share the listening socket and the kernel hands each connection to any of them -
+    in-memory state (sessions, resumable streams) is only visible to the worker that created it.
+    Anything that must survive a hop between workers belongs in shared storage.
+    """
+
+    def __init__(self, load_app, preload=None, host="0.0.0.0", port=10000, workers=2, on_worker_exit=None,
+                 min_uptime=5.0, max_rapid_failures=5, max_backoff=30.0):
+        """
+        Args:
+            load_app (callable): load_app() -> WSGI app, called in each worker
+            preload (callable, optional): Called once in the parent before forking
+            host (str): Address to listen on
+            port (int): Port to listen on
+            workers (int): Number of worker processes
+            on_worker_exit (callable, optional): on_worker_exit(pid), called in the parent
+                when a worker exits and before its replacement starts
+            min_uptime (float): A worker that exits sooner than this after starting failed to start
+            max_rapid_failures (int): Failed starts in a row before the server gives up
+            max_backoff (float): Longest delay in seconds before replacing a worker that failed to start
+        """
+        self.load_app = load_app
+        self.preload = preload
+        self.on_worker_exit = on_worker_exit
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.min_uptime = min_uptime
+        self.max_rapid_failures = max_rapid_failures
+        self.max_backoff = max_backoff
+        self._children = {}  # pid -> start time
+        self._stopping = False
+        self._rapid_failures = 0
+
+    def run(self):
+        """
+        Returns:
+            int: Exit status - 1 if the server stopped because workers kept failing to start
+        """
+        if self.preload is not None:
+            self.preload()
+        # Keep the preloaded objects out of the garbage collector's reach -
+        # otherwise a collection in a worker writes to their headers and copies the pages
+        gc.collect()
+        gc.freeze()
+
+        listener = socket.create_server((self.host, self.port), reuse_port=False)
+        listener.set_inheritable(True)
+        os.environ[PARENT_PID_ENV_VAR] = str(os.getpid())
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        print(f"🚀 Prefork server on {self.host}:{self.port} with {self.workers} workers (parent {os.getpid()})")
+        for _ in range(self.workers):
+            self._spawn(listener)
+
+        # Replace workers that die until asked to stop - with a growing delay while they die right
+        # after starting (a bad import or config), and not at all after max_rapid_failures of those
+        gave_up = False
+        respawns = []  # sorted times at which a replacement worker is due
+        while self._children or respawns:
+            if self._stopping:
+                respawns.clear()
+            while respawns and respawns[0] <= time.monotonic():
+                respawns.pop(0)
+                self._spawn(listener)
+            try:
+                if not respawns:
+                    pid, status = os.wait()
+                elif self._children:
+                    # Keep reaping during a backoff, so every exit is timed when it happens
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                else:
+                    pid = 0
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            if pid == 0:
+                time.sleep(max(0.0, min(0.2, respawns[0] - time.monotonic())))
+                continue
+            uptime = time.monotonic() - self._children.pop(pid)
+            if self.on_worker_exit is not None:
+                self.on_worker_exit(pid)
+            if self._stopping:
+                continue
+            self._rapid_failures = self._rapid_failures + 1 if uptime < self.min_uptime else 0
+            if self._rapid_failures >= self.max_rapid_failures:
+                print(f"❌ Workers failed to start {self._rapid_failures} times in a row, stopping the server")
+                gave_up = True
+                self._stop(None, None)
+                continue
+            delay = min(self.max_backoff, 2 ** (self._rapid_failures - 1)) if self._rapid_failures else 0
+            print(f"⚠️ Worker {pid} exited with status {os.waitstatus_to_exitcode(status)} after {uptime:.1f}s, "
+                  f"starting a new one" + (f" in {delay}s" if delay else ""))
+            bisect.insort(respawns, time.monotonic() + delay)
+        listener.close()
+        return 1 if gave_up else 0
+
+    def _spawn(self, listener):
+        pid = os.fork()
+        if pid:
+            self._children[pid] = time.monotonic()
+            return
+        # Worker
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            app = self.load_app()
+            server = make_server(self.host, self.port, app, threaded=True, fd=listener.fileno())
+            server.serve_forever()
+        except BaseException:
+            traceback.print_exc()
+            os._exit(1)
+        finally:
+            os._exit(0)
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self._children.pop(pid, None)
+
+
+def in_prefork_worker():
+    """Whether this process is a worker of a running prefork server"""
+    parent_pid = os.environ.get(PARENT_PID_ENV_VAR)
+    return bool(parent_pid) and int(parent_pid) == os.getppid()
+
+
+def process_memory(pid):
+    """
+    Memory of one process from /proc/<pid>/smaps_rollup (Linux)
+
+    Returns:
+        dict: rss, pss, shared and private bytes - or None if unavailable.
+            pss splits every shared page between the processes that map it,
+            so summing pss over the workers gives their real combined footprint.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        return None
+    return {
+        "pid": pid,
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def _child_pids(parent_pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="ascii") as f:
+                # The command name is in parentheses and may contain spaces - ppid is the 2nd field after it
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent_pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def memory_report():
+    """
+    Per-process memory for the whole server - the parent and every worker under the
+    prefork server, or just this process otherwise
+
+    Returns:
+        dict: Mode, per-process rss/pss/shared/private and totals
+    """
+    if in_prefork_worker():
+        parent_pid = os.environ[PARENT_PID_ENV_VAR]
+        parent = process_memory(int(parent_pid))
+        workers = [process_memory(pid) for pid in _child_pids(int(parent_pid))]
+        mode = "prefork"
+    else:
+        parent = None
+        workers = [process_memory(os.getpid())]
+        mode = "single"
+    workers = [worker for worker in workers if worker is not None]
+    processes = workers + ([parent] if parent else [])
+    return {
+        "mode": mode,
+        "current_pid": os.getpid(),
+        "parent": parent,
+        "workers": workers,
+        "totals": {
+            "rss_sum": sum(process["rss"] for process in processes),
+            "pss_sum": sum(process["pss"] for process in processes),
+            "shared_per_worker_avg": sum(worker["shared"] for worker in workers) // len(workers) if workers else 0,
+            "private_per_worker_avg": sum(worker["private"] for worker in workers) // len(workers) if workers else 0,
+        },
+        "timestamp": time.time(),
+    }
+
+
+def serve_from_environment(load_app, preload=None, on_worker_exit=None):
+    """Start the prefork server configured from the environment (PORT, WEB_WORKERS)"""
+    workers = int(os.environ.get("WEB_WORKERS", os.cpu_count() or 1))
+    port = int(os.environ.get("PORT", 10000))
+    sys.exit(PreforkServer(load_app, preload=preload, port=port, workers=workers, on_worker_exit=on_worker_exit).run())
@@ -0,0 +1,117 @@
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+
+class RequestProfiler:
+    """
+    Low-overhead sampling profiler for a single request
+    A background thread snapshots the target thread's stack every `interval` seconds
+    """
+
+    def __init__(self, interval=0.005):
+        self.profile_id = uuid.uuid4().hex
+        self.interval = interval
+        self.thread_id = None
+        self.started_at = None
+        self.elapsed = None
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        """Start sampling the calling thread"""
+        self.thread_id = threading.get_ident()
+        self.started_at = time.time()
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.profile_id[:8]}", daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        if self._sampler is None:
+            return
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+        self.elapsed = time.time() - self.started_at
+
+    def report(self, stages=None, top=15):
+        """
+        Args:
+            stages (dict, optional): Stage name -> wall seconds measured by the caller
+            top (int): Number of hot functions to return
+
+        Returns:
+            dict: Hot functions by self samples, stage wall times and the dump id
+        """
+        total = sum(self._stacks.values())
+        self_samples = Counter()
+        total_samples = Counter()
+        for stack, count in self._stacks.items():
+            self_samples[stack[-1]] += count
+            for frame in set(stack):
+                total_samples[frame] += count
+
+        hot_functions = [
+            {
+                'function': _frame_label(frame),
+                'self_samples': count,
+                'total_samples': total_samples[frame],
+                'self_percent': round(100.0 * count / total, 1) if total else 0.0
+            }
+            for frame, count in self_samples.most_common(top)
+        ]
+        return {
+            'profile_id': self.profile_id,
+            'interval_ms': self.interval * 1000,
+            'samples': total,
+            'wall_time': self.elapsed,
+            'stages': {name: round(seconds, 4) for name, seconds in (stages or {}).items()},
+            'hot_functions': hot_functions
+        }
+
+    def save(self, directory):
+        """
+        Write the samples in folded-stack format (one 'frame;frame;frame count' line per stack),
+        the input format of flamegraph.pl, speedscope and inferno
+
+        Returns:
+            str: Path of the dump
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.profile_id}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(";".join(_frame_label(frame) for frame in stack) + f" {count}\n")
+        return path
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self._stacks[tuple(reversed(stack))] += 1
+
+
+def _frame_label(frame):
+    filename, line, name = frame
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+def profile_path(directory, profile_id):
+    """
+    Returns:
+        str: Path of a stored dump, or None if the id is malformed or unknown
+    """
+    if not re.fullmatch(r"[0-9a-f]{32}", profile_id or ""):
+        return None
+    path = os.path.join(directory, f"{profile_id}.folded")
+    return path if os.path.exists(path) else None
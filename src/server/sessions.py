@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+import uuid
+
+
+class EditSession:
+    """
+    One editing session - the incremental analysis plus the last model output
+    Edits on the same session are serialized with its lock
+    """
+
+    def __init__(self, session_id, analysis, language):
+        self.session_id = session_id
+        self.analysis = analysis
+        self.language = language
+        self.version = 0
+        self.signature = None
+        self.model_output = None
+        self.last_activity = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class SessionStore:
+    """
+    In-memory editing sessions, evicted after ttl_seconds without activity
+    """
+
+    def __init__(self, ttl_seconds=3600, max_sessions=1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, analysis, language):
+        self._evict_expired()
+        session = EditSession(uuid.uuid4().hex, analysis, language)
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                # drop the least recently used session
+                oldest = min(self._sessions.values(), key=lambda s: s.last_activity)
+                del self._sessions[oldest.session_id]
+            self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id):
+        self._evict_expired()
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_activity = time.monotonic()
+        return session
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                session_id for session_id, session in self._sessions.items()
+                if now - session.last_activity > self.ttl_seconds
+            ]
+            for session_id in expired:
+                del self._sessions[session_id]
+
+
+def create_session_store():
+    """Build a SessionStore configured from the environment"""
+    ttl_seconds = int(os.environ.get("SESSION_TTL_SECONDS", 3600))
+    max_sessions = int(os.environ.get("MAX_SESSIONS", 1000))
+    return SessionStore(ttl_seconds=ttl_seconds, max_sessions=max_sessions)
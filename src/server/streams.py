@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+
+class EventStream:
+    """
+    Bounded ring buffer of numbered events produced by one running analysis
+    Readers can attach at any sequence id and replay what they missed
+    """
+
+    def __init__(self, stream_id, max_events=256):
+        self.stream_id = stream_id
+        self.finished = False
+        self.last_activity = time.monotonic()
+        self._events = deque(maxlen=max_events)
+        self._next_seq = 1
+        self._changed = threading.Condition()
+
+    def publish(self, payload):
+        with self._changed:
+            self._events.append((self._next_seq, payload))
+            self._next_seq += 1
+            self.last_activity = time.monotonic()
+            self._changed.notify_all()
+
+    def finish(self):
+        with self._changed:
+            self.finished = True
+            self.last_activity = time.monotonic()
+            self._changed.notify_all()
+
+    def read(self, after_seq=0, timeout=15):
+        """
+        Yield (seq, payload) for every event after after_seq, blocking for new ones
+        until the producer finishes
+
+        Events that already fell out of the buffer cannot be replayed - the reader gets a
+        {'type': 'gap'} event with the missed sequence range in their place, so it knows to
+        refetch the full result instead of assuming it has everything.
+
+        Args:
+            after_seq (int): Last sequence id the reader already has
+            timeout (float): Maximum seconds to wait for a single new event
+        """
+        while True:
+            with self._changed:
+                pending = [event for event in self._events if event[0] > after_seq]
+                if not pending:
+                    if self.finished:
+                        return
+                    self._changed.wait(timeout)
+                    self.last_activity = time.monotonic()
+                    continue
+            oldest = pending[0][0]
+            if oldest > after_seq + 1:
+                yield oldest - 1, {"type": "gap", "missed_from": after_seq + 1, "missed_to": oldest - 1}
+            for seq, payload in pending:
+                after_seq = seq
+                yield seq, payload
+
+
+class StreamRegistry:
+    """
+    Keeps running and recently finished streams so reconnecting clients can resume
+    """
+
+    def __init__(self, ttl_seconds=600, max_events=256):
+        self.ttl_seconds = ttl_seconds
+        self.max_events = max_events
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def start(self, producer):
+        """
+        Run producer in a background thread, publishing everything it yields
+
+        Args:
+            producer (iterable): Generator of JSON-serializable event payloads
+
+        Returns:
+            EventStream: The stream readers should attach to
+        """
+        self._evict_expired()
+        stream = EventStream(uuid.uuid4().hex, max_events=self.max_events)
+        with self._lock:
+            self._streams[stream.stream_id] = stream
+
+        def run():
+            try:
+                for payload in producer:
+                    stream.publish(payload)
+            finally:
+                stream.finish()
+
+        threading.Thread(target=run, name=f"stream-{stream.stream_id[:8]}", daemon=True).start()
+        return stream
+
+    def get(self, stream_id):
+        self._evict_expired()
+        with self._lock:
+            return self._streams.get(stream_id)
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                stream_id for stream_id, stream in self._streams.items()
+                if stream.finished and now - stream.last_activity > self.ttl_seconds
+            ]
+            for stream_id in expired:
+                del self._streams[stream_id]
+
+
+def parse_last_event_id(value):
+    """
+    Split a Last-Event-ID of the form '<stream_id>:<seq>'
+
+    Returns:
+        tuple: (stream_id, seq), or (None, 0) if the value is missing or malformed
+    """
+    if not value or ":" not in value:
+        return None, 0
+    stream_id, _, seq = value.rpartition(":")
+    try:
+        return stream_id, int(seq)
+    except ValueError:
+        return None, 0
+
+
+def create_stream_registry():
+    """Build a StreamRegistry configured from the environment"""
+    ttl_seconds = int(os.environ.get("STREAM_TTL_SECONDS", 600))
+    max_events = int(os.environ.get("STREAM_BUFFER_EVENTS", 256))
+    return StreamRegistry(ttl_seconds=ttl_seconds, max_events=max_events)
@@ -0,0 +1,164 @@
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import grpc
+import google.ai.generativelanguage as glm
+from google.api_core import retry as api_retry
+from google.ai.generativelanguage_v1beta.services.generative_service.transports.grpc import (
+    GenerativeServiceGrpcTransport,
+)
+
+
+class TransportBusy(Exception):
+    """Raised when no call slot frees up before the call timeout"""
+
+
+class PooledTransport:
+    """
+    Shared pool of long-lived gRPC channels to the Gemini API
+
+    Every Gemini client is pinned to one channel of the pool, and calls on a channel are
+    multiplexed over its single HTTP/2 connection. Channels connect as soon as they are created
+    and send keep-alive pings while idle, so the TLS handshake happens at boot and not on the
+    first request after a quiet period.
+    """
+
+    def __init__(self, credentials, pool_size=2, max_concurrent_calls=32, call_timeout=120.0,
+                 keepalive_seconds=30, keepalive_timeout_seconds=10):
+        """
+        Args:
+            credentials (google.auth.credentials.Credentials): Credentials for every channel
+            pool_size (int): Number of channels (connections)
+            max_concurrent_calls (int): Calls in flight at once across the pool
+            call_timeout (float): Deadline in seconds for a single call
+            keepalive_seconds (int): Interval of keep-alive pings, also while idle
+            keepalive_timeout_seconds (int): How long to wait for a ping ack before reconnecting
+        """
+        self.pool_size = pool_size
+        self.max_concurrent_calls = max_concurrent_calls
+        self.call_timeout = call_timeout
+        self._options = [
+            ("grpc.keepalive_time_ms", keepalive_seconds * 1000),
+            ("grpc.keepalive_timeout_ms", keepalive_timeout_seconds * 1000),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+        ]
+        # The SDK's default retry keeps retrying an unreachable backend for minutes -
+        # transient errors are still retried, but within the same deadline as the call
+        self._retry = api_retry.Retry(predicate=api_retry.if_transient_error, timeout=call_timeout)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrent_calls)
+        self._next = itertools.count()
+        self._channels = [
+            {"state": "idle", "connects": 0, "calls": 0, "reused_calls": 0, "in_flight": 0, "errors": 0,
+             "call_seconds": 0.0}
+            for _ in range(pool_size)
+        ]
+        self._clients = [
+            glm.GenerativeServiceClient(transport=GenerativeServiceGrpcTransport(
+                credentials=credentials,
+                channel=self._channel_factory(index),
+                always_use_jwt_access=True
+            ))
+            for index in range(pool_size)
+        ]
+
+    def client(self):
+        """
+        Next channel's client, round-robin - pin a Gemini client to it once
+
+        Returns:
+            tuple: (channel index, GenerativeServiceClient)
+        """
+        index = next(self._next) % self.pool_size
+        return index, self._clients[index]
+
+    @contextmanager
+    def call(self, index):
+        """
+        Hold a call slot on a channel for the duration of one call
+
+        Yields:
+            dict: request_options to pass to the SDK (per-call timeout and retry deadline)
+
+        Raises:
+            TransportBusy: If every slot stays taken for the whole call timeout
+        """
+        if not self._slots.acquire(timeout=self.call_timeout):
+            raise TransportBusy(f"No Gemini call slot free within {self.call_timeout}s")
+        channel = self._channels[index]
+        with self._lock:
+            channel["calls"] += 1
+            # A call that starts on a ready channel skips connection setup and the TLS handshake
+            if channel["state"] == "ready":
+                channel["reused_calls"] += 1
+            channel["in_flight"] += 1
+        start = time.monotonic()
+        try:
+            yield {"timeout": self.call_timeout, "retry": self._retry}
+        except Exception:
+            with self._lock:
+                channel["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                channel["in_flight"] -= 1
+                channel["call_seconds"] += time.monotonic() - start
+            self._slots.release()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Per channel connection state, connections made and calls carried.
+                reused_calls counts calls that started on an already open connection.
+        """
+        with self._lock:
+            channels = [dict(channel, index=index) for index, channel in enumerate(self._channels)]
+        for channel in channels:
+            channel["call_seconds"] = round(channel["call_seconds"], 3)
+        return {
+            "transport": "pooled-grpc",
+            "pool_size": self.pool_size,
+            "max_concurrent_calls": self.max_concurrent_calls,
+            "call_timeout": self.call_timeout,
+            "calls": sum(channel["calls"] for channel in channels),
+            "connects": sum(channel["connects"] for channel in channels),
+            "reused_calls": sum(channel["reused_calls"] for channel in channels),
+            "channels": channels,
+        }
+
+    def _channel_factory(self, index):
+        def create_channel(host, options=(), **kwargs):
+            # Same channel the SDK would build, plus keep-alive
+            channel = GenerativeServiceGrpcTransport.create_channel(host, options=list(options) + self._options, **kwargs)
+            channel.subscribe(lambda state: self._on_state(index, state), try_to_connect=True)
+            return channel
+        return create_channel
+
+    def _on_state(self, index, state):
+        with self._lock:
+            channel = self._channels[index]
+            channel["state"] = state.value[1]
+            if state == grpc.ChannelConnectivity.READY:
+                channel["connects"] += 1
+
+
+def create_transport(credentials):
+    """
+    Build the shared transport configured from the environment
+
+    Returns:
+        PooledTransport: The pool, or None when GEMINI_TRANSPORT=sdk keeps the SDK's default transport
+    """
+    if os.environ.get("GEMINI_TRANSPORT", "pooled") == "sdk":
+        return None
+    return PooledTransport(
+        credentials,
+        pool_size=int(os.environ.get("GEMINI_POOL_SIZE", 2)),
+        max_concurrent_calls=int(os.environ.get("GEMINI_MAX_CONCURRENT_CALLS", 32)),
+        call_timeout=float(os.environ.get("GEMINI_CALL_TIMEOUT", 120)),
+        keepalive_seconds=int(os.environ.get("GEMINI_KEEPALIVE_SECONDS", 30)),
+    )